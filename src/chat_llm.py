@@ -1,12 +1,14 @@
 
 import hashlib
 import json
-import re
 import streamlit as st
 
 import config
 import rag_search_remote
+import model_registry
+import collection_manager
 from models_sql import Session, Profile
+from job_embedder import get_collection_name
 
 
 instructions = """
@@ -47,20 +49,26 @@ def send_prompt_to_llm(user_prompt, job_ids_to_process):
 
     batch_id = compute_batch_id(job_ids_to_process)
 
-    collection_name = f"jobs_{config.embed_model}_{batch_id}"
-    collection_name = re.sub(r"[^a-zA-Z0-9_-]", "_", collection_name)
+    collection_name = get_collection_name(config.embed_model)
 
-    with st.status(f"Generating advice...", expanded=True) as st_status:
+    st_status = st.status(f"Generating advice...", expanded=True)
 
-        st.write(f"Loading embedding model: {config.embed_model}...")
+    # the answer renders below the status box, which stays running until the stream ends
+    answer_box = st.container()
 
-        status, output = rag_search_remote.load_model([config.embed_model])
+    with st_status:
+
+        if not model_registry.is_loaded(config.embed_model):
+            st.write(f"Loading embedding model: {config.embed_model}...")
+
+        status, output = model_registry.ensure_loaded([config.embed_model])
         if not status:
+            st_status.update(label="Cannot load embedding model", state="error", expanded=True)
             return False, f"Cannot load model: {output}"
 
         st.write(f"Analyzing {len(job_ids_to_process)} job context...")
 
-        status, output = rag_search_remote.rag_chat(
+        status, output = rag_search_remote.rag_chat_stream(
             user_prompt,
             config.llm_model_chat,
             config.embed_model,
@@ -68,15 +76,30 @@ def send_prompt_to_llm(user_prompt, job_ids_to_process):
             instructions=instructions,
             session_id=f"job_{batch_id}",
             score_threshold=0.7,
-            max_documents=10
+            max_documents=10,
+            filter_dict={"metadata.job_id": job_ids_to_process}
         )
 
-        st_status.update(label="Response received!", state="complete", expanded=False)
+        if not status:
+            st_status.update(label="Request failed", state="error", expanded=True)
+            model_registry.invalidate([config.embed_model])
+            return False, output
+
+        with Session() as db_session:
+            collection_manager.touch(db_session, collection_name, embed_model=config.embed_model)
+
+        st_status.update(label="Streaming response...", expanded=False)
+
+        # render tokens as they arrive; write_stream returns the full answer
+        answer = answer_box.write_stream(output)
+
+        if output.error:
+            st_status.update(label="Response failed", state="error", expanded=False)
+            return False, output.error
 
-    if not status:
-        return False, output
+        st_status.update(label="Response complete", state="complete", expanded=False)
 
-    return True, output
+    return True, answer
 
 
 def get_resume_summary():
@@ -0,0 +1,144 @@
+
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+
+import config
+import rag_search_remote
+from models_sql import VectorCollection, CollectionJob
+
+log = logging.getLogger(__name__)
+
+# Only collections created by Job-Genius are managed (jobs_<model> and the legacy jobs_<model>_<batch_id>).
+collection_prefix = "jobs_"
+
+last_gc_run = 0.0
+
+
+def touch(db_session, collection_name, embed_model=None, added_points=0, vector_dim=None):
+    """
+    Record that a collection was used, and optionally that points were added to it.
+    num_points is only an estimate between clean-ups (deletes by filter are not tracked);
+    collect_garbage replaces it with the count reported by the server.
+    """
+
+    now = datetime.now(timezone.utc)
+
+    record = db_session.query(VectorCollection).filter(VectorCollection.name == collection_name).first()
+
+    if not record:
+        record = VectorCollection(name=collection_name, embed_model=embed_model, num_points=0, created_at=now)
+        db_session.add(record)
+
+    record.last_used_at = now
+    record.num_points = (record.num_points or 0) + added_points
+
+    if vector_dim:
+        record.vector_dim = vector_dim
+
+    db_session.commit()
+
+
+def collect_garbage(db_session, keep=()):
+    """
+    Delete collections idle for longer than config.collection_max_idle_days, then the
+    least recently used ones until the remaining points fit config.collection_max_points.
+    Collections in keep are never deleted.
+
+    Returns (True, report) where report lists the deleted collections and the storage reclaimed.
+    """
+
+    global last_gc_run
+    last_gc_run = time.monotonic()
+
+    status, output = rag_search_remote.get_collections()
+    if not status:
+        return False, f"get_collections error: {output}"
+
+    existing = [name for name in output if name.startswith(collection_prefix)]
+
+    records = {
+        record.name: record
+        for record in db_session.query(VectorCollection).filter(VectorCollection.name.in_(existing)).all()
+    }
+
+    # collections we have never seen (e.g. created before tracking) start their idle clock now
+    for name in existing:
+        if name not in records:
+            records[name] = VectorCollection(name=name, num_points=None)
+            db_session.add(records[name])
+
+    # sizes come from the server; None when it does not report them
+    for name, record in records.items():
+
+        status, output = rag_search_remote.get_collection_size(name)
+        if not status:
+            log.warning(f"[CollectionManager] cannot get size of {name}: {output}")
+            record.num_points = None
+            continue
+
+        points, dim = output
+        record.num_points = points
+        record.vector_dim = dim or record.vector_dim
+
+    db_session.flush()
+
+    candidates = sorted(
+        (record for record in records.values() if record.name not in keep),
+        key=lambda record: record.last_used_at)
+
+    idle_cutoff = datetime.now(timezone.utc) - timedelta(days=config.collection_max_idle_days)
+    total_points = sum(record.num_points or 0 for record in records.values())
+
+    to_delete = []
+
+    for record in candidates:
+        if record.last_used_at < idle_cutoff or total_points > config.collection_max_points:
+            to_delete.append(record)
+            total_points -= record.num_points or 0
+
+    report = {
+        "deleted": [],
+        "points_reclaimed": 0,
+        "bytes_reclaimed": 0,
+        "unknown_size": 0   # deleted collections whose size the server did not report
+    }
+
+    for record in to_delete:
+
+        status, output = rag_search_remote.delete_collection(record.name)
+        if not status:
+            log.warning(f"[CollectionManager] cannot delete {record.name}: {output}")
+            continue
+
+        db_session.query(CollectionJob).filter(
+            CollectionJob.collection_name == record.name).delete(synchronize_session=False)
+        db_session.delete(record)
+
+        report["deleted"].append(record.name)
+
+        if record.num_points is None or not record.vector_dim:
+            report["unknown_size"] += 1
+            continue
+
+        report["points_reclaimed"] += record.num_points
+        report["bytes_reclaimed"] += record.num_points * record.vector_dim * 4  # float32
+
+    db_session.commit()
+
+    if report["deleted"]:
+        log.info(f"[CollectionManager] deleted {len(report['deleted'])} collections, "
+                 f"reclaimed {report['points_reclaimed']} points (~{report['bytes_reclaimed'] / 1e6:.1f} MB)")
+
+    return True, report
+
+
+def maybe_collect_garbage(db_session, keep=()):
+    """
+    Run collect_garbage at most once every config.collection_gc_interval seconds.
+    """
+
+    if last_gc_run and time.monotonic() - last_gc_run < config.collection_gc_interval:
+        return True, None
+
+    return collect_garbage(db_session, keep)
@@ -1,10 +1,72 @@
 # config.py
 
 rag_search_url = "http://192.168.2.130:8000"
+rag_health_ttl = 15  # seconds
+model_registry_ttl = 10*60  # seconds a loaded model / model list is trusted without asking the server
 
 llm_model_summarization = "ollama/llama3.1:8b"
 llm_model_chat = "gpt-4o"
 embed_model = "bge-m3"
+embed_models_retained = []  # other embedding models whose stored vectors survive clean-up
+
+summarization_workers = 4   # concurrent summarization requests; match the LLM backend's parallelism
+summary_output_tokens = 1024  # context reserved for the generated summary
+map_reduce_workers = 4        # concurrent chunk summaries for postings that exceed the context
+summarization_pack_size = 4         # short jobs summarized in one LLM request; 1 disables packing
+summarization_pack_job_tokens = 1200  # jobs up to this many tokens count as short
+on_demand_workers = 2         # concurrent single-job summaries requested from job cards
+preview_sentences = 3         # description sentences in the extractive preview shown until the LLM summary exists
+preview_bullets = 3           # bullets kept per job highlights section in the preview
+job_lease_seconds = 5*60      # a job's enrichment lease expires this long after its holder stops renewing it
+job_lease_wait_seconds = 30   # wait this long for jobs another worker is enriching before skipping them
+job_lease_poll_seconds = 1
+
+# local tokenizer per model ("tiktoken:<encoding>" or "hf:<Hugging Face repo>"); others are estimated
+tokenizer_map = {
+    "ollama/llama3.1:8b": "hf:unsloth/Llama-3.1-8B-Instruct",
+    "gpt-4o": "tiktoken:o200k_base",
+    "bge-m3": "hf:BAAI/bge-m3",
+}
+
+# background enrichment of newly ingested jobs
+
+background_enrichment = True
+background_workers = 2          # concurrent LLM / embedding requests of the background worker
+background_batch_size = 20      # jobs per background batch
+background_retry_seconds = 30   # wait while RAG-Search is unreachable
+
+enrichment_max_attempts = 3     # attempts per job and stage before giving up
+enrichment_retry_backoff = 2    # seconds before the first retry, doubled on each attempt
+
+write_buffer_max_items = 25     # jobs per commit in the enrichment loops
+write_buffer_max_seconds = 5    # ...or at least this often
+
+embed_max_workers = 4       # concurrent embedding requests
+embed_token_reserve = 16    # chunks stay this many tokens below the model limit, for its special tokens
+add_points_batch_size = 256 # points per add_points request
+
+# model residency budget on the inference host (least-recently-used models are unloaded)
+
+max_resident_models = 3
+max_resident_memory_gb = 12
+
+default_model_memory_gb = 4.0
+model_memory_gb = {
+    "ollama/llama3.1:8b": 4.9,
+    "bge-m3": 2.2,
+    "gpt-4o": 0,  # hosted, never resident
+}
+
+# vector collection garbage collection on RAG-Search
+
+collection_max_idle_days = 14
+collection_max_points = 200000
+collection_gc_interval = 6*60*60  # seconds between automatic clean-ups
+
+# local semantic search over job_embeddings
+
+vector_index_dir = "/app/data/vector_index"
+semantic_min_score = 0.5
 
 # dark / light / road / satellite / dark_no_labels / light_no_labels
 
@@ -1,9 +1,11 @@
 
 import math
 import re
-from collections import Counter
+import threading
+from collections import Counter, OrderedDict
 from datetime import datetime, timedelta, timezone
 import streamlit as st
+from sqlalchemy import func
 import pandas as pd
 import pydeck as pdk
 import phonenumbers
@@ -11,7 +13,13 @@ from phonenumbers import PhoneNumberFormat
 from cleanco import basename
 
 import config
-from models_sql import Session, Job, Profile
+import rag_search_remote
+import vector_index
+import on_demand_summary
+import enrichment_daemon
+import enrichment_priority
+import structured_summary
+from models_sql import Session, Job, JobSkill, Profile
 from db_profiles import update_favorite_job
 from finnhub_api import Finnhub_REST_API_Client
 
@@ -33,11 +41,24 @@ def process_results(job_id_list, profile_data):
 
     visible_jobs = update_filter_bar(visible_jobs)
 
+    visible_jobs = filter_jobs_by_structured_fields(db_session, visible_jobs)
+
+    st.text_input("Semantic Search", placeholder="Describe the role you want, e.g. backend work on distributed systems", key="semantic_query")
+    semantic_query = st.session_state.get("semantic_query", "")
+    visible_jobs = filter_jobs_semantic(visible_jobs, semantic_query)
+
     ###############
 
     visible_job_ids = [job.job_id for job in visible_jobs if job.job_id]
     st.session_state["visible_job_ids"] = visible_job_ids
 
+    # let the background enrichment catch up on what is on screen first
+    enrichment_daemon.prioritize(enrichment_priority.get_priorities(
+        visible_job_ids,
+        visible_job_ids,
+        st.session_state.get("favorite_jobs", ()),
+        st.session_state.get("focused_job_ids", ())))
+
     st.success(f"Found {len(visible_jobs)} jobs")
 
     update_job_map(visible_jobs, profile_data)
@@ -120,6 +141,124 @@ def update_filter_bar(job_list):
     return final_result_list
 
 
+def filter_jobs_by_structured_fields(db_session, visible_jobs):
+    """
+    Facets on the fields extracted during summarization: seniority, remote policy, skills
+    and the maximum years of experience required. Filters and facet counts run in SQL on
+    the indexed jobs columns and the job_skills table; as in update_filter_bar, counts
+    reflect the current selections.
+    """
+
+    ids = [job.id for job in visible_jobs]
+    if not ids:
+        return visible_jobs
+
+    # Helper to extract raw value from label
+    def extract_raw_value(label):
+        return label.rsplit(" (", 1)[0] if " (" in label else label
+
+    def matching_ids(seniority, remote_policy, skills, max_years):
+
+        query = db_session.query(Job.id).filter(Job.id.in_(ids))
+
+        if seniority != "All":
+            query = query.filter(Job.seniority == seniority)
+
+        if remote_policy != "All":
+            query = query.filter(Job.remote_policy == remote_policy)
+
+        if skills:
+            having_all_skills = (
+                db_session.query(JobSkill.job_id)
+                .filter(JobSkill.skill.in_(skills))
+                .group_by(JobSkill.job_id)
+                .having(func.count(func.distinct(JobSkill.skill)) == len(skills))
+            )
+            query = query.filter(Job.id.in_(having_all_skills))
+
+        if max_years is not None:
+            query = query.filter(Job.min_years_experience <= max_years)
+
+        return query
+
+    def count_by(column, filtered_ids):
+        return dict(
+            db_session.query(column, func.count(Job.id))
+            .filter(Job.id.in_(filtered_ids), column != None)
+            .group_by(column)
+            .all()
+        )
+
+    def format_options(counts, order):
+        return ["All"] + [f"{value} ({counts[value]})" for value in order if value in counts]
+
+    # Step 1: Pre-filter in SQL based on current selections
+    selected_seniority_label = st.session_state.get("filter_seniority", "All")
+    selected_remote_label = st.session_state.get("filter_remote_policy", "All")
+    selected_skills = st.session_state.get("filter_skills", [])
+    max_years = st.session_state.get("filter_max_years")
+
+    filtered_ids = matching_ids(
+        extract_raw_value(selected_seniority_label),
+        extract_raw_value(selected_remote_label),
+        selected_skills,
+        max_years)
+
+    # Step 2: Facet counts with GROUP BY over the pre-filtered jobs
+    seniority_counts = count_by(Job.seniority, filtered_ids)
+    remote_counts = count_by(Job.remote_policy, filtered_ids)
+
+    skill_counts = dict(
+        db_session.query(JobSkill.skill, func.count(JobSkill.job_id))
+        .filter(JobSkill.job_id.in_(filtered_ids))
+        .group_by(JobSkill.skill)
+        .order_by(func.count(JobSkill.job_id).desc(), JobSkill.skill)
+        .all()
+    )
+
+    # Step 3: Build UI with filtered options
+    col1, col2, col3, col4 = st.columns([1, 1, 2, 1])
+
+    with col1:
+        seniority_options = format_options(seniority_counts, structured_summary.seniority_levels)
+        selected_seniority_label = st.selectbox(
+            "Seniority", seniority_options,
+            index=seniority_options.index(selected_seniority_label) if selected_seniority_label in seniority_options else 0,
+            key="filter_seniority"
+        )
+        selected_seniority = extract_raw_value(selected_seniority_label)
+
+    with col2:
+        remote_options = format_options(remote_counts, structured_summary.remote_policies)
+        selected_remote_label = st.selectbox(
+            "Remote Policy", remote_options,
+            index=remote_options.index(selected_remote_label) if selected_remote_label in remote_options else 0,
+            key="filter_remote_policy"
+        )
+        selected_remote = extract_raw_value(selected_remote_label)
+
+    with col3:
+        # selected skills stay selectable even when no pre-filtered job has them anymore
+        skill_options = list(skill_counts) + [skill for skill in selected_skills if skill not in skill_counts]
+        selected_skills = st.multiselect(
+            "Skills",
+            skill_options,
+            format_func=lambda skill: f"{skill} ({skill_counts.get(skill, 0)})",
+            key="filter_skills"
+        )
+
+    with col4:
+        max_years = st.number_input("Max Years Required", min_value=0, max_value=50, value=None, step=1, key="filter_max_years")
+
+    # Step 4: Apply final filters
+    if selected_seniority == "All" and selected_remote == "All" and not selected_skills and max_years is None:
+        return visible_jobs
+
+    final_ids = {row[0] for row in matching_ids(selected_seniority, selected_remote, selected_skills, max_years).all()}
+
+    return [job for job in visible_jobs if job.id in final_ids]
+
+
 def filter_jobs_by_search(visible_jobs, search_term):
 
     if not search_term:
@@ -144,6 +283,68 @@ def filter_jobs_by_search(visible_jobs, search_term):
     return filtered
 
 
+def filter_jobs_semantic(visible_jobs, query):
+    """
+    Keep the jobs whose embedded summary matches the query, best match first.
+    Only the query is embedded remotely; the search runs on the local vector index.
+    """
+
+    query = query.strip()
+    if not query or not visible_jobs:
+        return visible_jobs
+
+    status, output = get_query_vector(query)
+    if not status:
+        st.warning(f"Semantic search unavailable: {output}")
+        return visible_jobs
+
+    query_vector = output
+
+    index = vector_index.get_index(config.embed_model)
+
+    with Session() as db_session:
+        index.refresh(db_session)
+
+    jobs_by_id = {job.id: job for job in visible_jobs}
+
+    results = index.search(query_vector, k=len(jobs_by_id), job_ids=jobs_by_id.keys())
+
+    if len(results) < len(jobs_by_id):
+        st.caption(f"{len(jobs_by_id) - len(results)} jobs are not embedded yet. Use 'Enrich Jobs' to include them.")
+
+    return [jobs_by_id[job_id] for job_id, score in results if score >= config.semantic_min_score]
+
+
+query_vector_cache = OrderedDict()  # (embed model, query) -> vector
+query_vector_cache_size = 256
+query_vector_lock = threading.Lock()
+
+
+def get_query_vector(query):
+
+    key = (config.embed_model, query)
+
+    with query_vector_lock:
+        if key in query_vector_cache:
+            query_vector_cache.move_to_end(key)
+            return True, query_vector_cache[key]
+
+    status, output = rag_search_remote.get_embedding(query, config.embed_model)
+    if not status:
+        return False, output
+
+    vectors = output.get("vectors", [])
+    if not vectors:
+        return False, "No vector returned for the query"
+
+    with query_vector_lock:
+        query_vector_cache[key] = vectors[0]
+        if len(query_vector_cache) > query_vector_cache_size:
+            query_vector_cache.popitem(last=False)
+
+    return True, vectors[0]
+
+
 def update_job_map(job_list, profile_data):
 
     data = [
@@ -301,6 +502,7 @@ def show_jobs(job_list, key_prefix="main"):
 
                 if st.button(f"🔍 Show More About the Company", key=company_key):
                     st.session_state[show_key] = not st.session_state.get(show_key, False)
+                    focus_job(job_id)
 
                 if st.session_state.get(show_key, False):
 
@@ -356,10 +558,34 @@ def show_jobs(job_list, key_prefix="main"):
                 st.markdown(f"**🕓 Posted:** {posted}")
                 st.markdown(f"**🔗 [Job Link]({job.apply_link or '#'})**")
 
-                job_summary = job.job_summary
+                summary_key = f"{key_prefix}_summary_{job_id}"
+
+                job_summary = job.job_summary or st.session_state.get(summary_key)
+
+                if not job_summary:
+
+                    in_flight = on_demand_summary.is_in_flight(job.id)
+                    label = "⏳ Summarization In Progress" if in_flight else "🧠 Summarize This Job"
+
+                    if st.button(label, key=f"{key_prefix}_summarize_{job_id}"):
+
+                        focus_job(job_id)
+
+                        with st.spinner("Summarizing job..."):
+                            status, output = on_demand_summary.get_summary(job.id)
+
+                        if status:
+                            st.session_state[summary_key] = job_summary = output
+                        else:
+                            st.error(f"❌ Summarization failed: {output}")
+
                 if job_summary:
                     st.markdown("#### ✨ Job Highlights")
                     st.markdown(job_summary)
+                elif job.preview_summary:
+                    st.markdown("#### ⚡ Quick Preview")
+                    st.caption("Extracted from the posting; the full summary replaces it once the job is summarized.")
+                    st.markdown(job.preview_summary)
                 else:
                     highlights = job.job_highlights
                     if highlights:
@@ -405,6 +631,17 @@ def show_jobs(job_list, key_prefix="main"):
                 st.rerun()
 
 
+def focus_job(job_id, max_focused=20):
+    """
+    Remember that the user opened this job's card, most recent last, so it is enriched first.
+    """
+
+    focused = [focused_id for focused_id in st.session_state.get("focused_job_ids", []) if focused_id != job_id]
+    focused.append(job_id)
+
+    st.session_state["focused_job_ids"] = focused[-max_focused:]
+
+
 def get_stock_details(company_name):
 
     stock_info = {}
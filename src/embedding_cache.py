@@ -0,0 +1,42 @@
+import hashlib
+from sqlalchemy.dialects.postgresql import insert
+
+from models_sql import EmbeddingCache
+from summary_cache import normalize_text
+
+
+def get_key(chunk_text, embed_model):
+
+    hash_input = f"{embed_model}\n{normalize_text(chunk_text)}".encode("utf-8")
+    return hashlib.sha256(hash_input).hexdigest()
+
+
+def lookup(db_session, keys):
+    """
+    Returns a dict content_hash -> embedding for the keys found in the cache.
+    """
+
+    if not keys:
+        return {}
+
+    rows = (
+        db_session.query(EmbeddingCache.content_hash, EmbeddingCache.embedding)
+        .filter(EmbeddingCache.content_hash.in_(set(keys)))
+        .all()
+    )
+
+    return {content_hash: embedding for content_hash, embedding in rows}
+
+
+def store(db_session, key, embed_model, embedding):
+    """
+    Add an embedding to the cache; does not commit. Concurrent writers of the same key are fine.
+    """
+
+    stmt = insert(EmbeddingCache).values(
+        content_hash=key,
+        embed_model=embed_model,
+        embedding=embedding
+    ).on_conflict_do_nothing(index_elements=["content_hash"])
+
+    db_session.execute(stmt)
@@ -0,0 +1,109 @@
+from sqlalchemy import and_, or_, tuple_, func
+
+import config
+import text_splitter
+from models_sql import Job, JobEmbedding
+
+# job_embeddings rows record the embedding model and chunker version that produced them.
+# A job counts as embedded for a (model, chunker version) pair when it has rows for that
+# pair, so several models can coexist, switching config.embed_model only embeds what is
+# missing for the new one, and versions nobody uses anymore can be removed.
+
+
+def current_version():
+
+    return config.embed_model, text_splitter.chunker_version
+
+
+def is_embedded_clause(embed_model=None, chunker_version=None):
+    """
+    SQL condition on Job: the job has embeddings for the pair (the current one by default).
+    """
+
+    default_model, default_version = current_version()
+
+    return Job.embeddings.any(and_(
+        JobEmbedding.embed_model == (embed_model or default_model),
+        JobEmbedding.chunker_version == (chunker_version or default_version)))
+
+
+def embedded_job_ids(db_session, job_ids, embed_model=None, chunker_version=None):
+    """
+    Returns the subset of job_ids (jobs.id) embedded for the pair (the current one by default).
+    """
+
+    if not job_ids:
+        return set()
+
+    rows = (
+        db_session.query(Job.id)
+        .filter(Job.id.in_(job_ids), is_embedded_clause(embed_model, chunker_version))
+        .all()
+    )
+
+    return {job_id for (job_id,) in rows}
+
+
+def get_embeddings(db_session, job_id, embed_model=None, chunker_version=None):
+    """
+    The chunk rows of one job for the pair (the current one by default), in chunk order.
+    """
+
+    default_model, default_version = current_version()
+
+    return (
+        db_session.query(JobEmbedding)
+        .filter(
+            JobEmbedding.job_id == job_id,
+            JobEmbedding.embed_model == (embed_model or default_model),
+            JobEmbedding.chunker_version == (chunker_version or default_version))
+        .order_by(JobEmbedding.chunk_index)
+        .all()
+    )
+
+
+def get_versions(db_session):
+    """
+    Returns a list of (embed_model, chunker_version, jobs, chunks) for every stored pair.
+    """
+
+    return (
+        db_session.query(
+            JobEmbedding.embed_model,
+            JobEmbedding.chunker_version,
+            func.count(func.distinct(JobEmbedding.job_id)),
+            func.count(JobEmbedding.id))
+        .group_by(JobEmbedding.embed_model, JobEmbedding.chunker_version)
+        .all()
+    )
+
+
+def collect_garbage(db_session, keep=None):
+    """
+    Delete the embeddings of every (model, chunker version) pair not in keep.
+    keep defaults to the current pair plus config.embed_models_retained at the current
+    chunker version. Rows from before versioning (no model recorded) are always removed.
+    Returns (True, number of rows deleted).
+    """
+
+    if keep is None:
+        keep = [
+            (embed_model, text_splitter.chunker_version)
+            for embed_model in [config.embed_model] + list(config.embed_models_retained)
+        ]
+
+    try:
+        deleted = (
+            db_session.query(JobEmbedding)
+            .filter(or_(
+                JobEmbedding.embed_model == None,
+                JobEmbedding.chunker_version == None,
+                tuple_(JobEmbedding.embed_model, JobEmbedding.chunker_version).notin_(keep)))
+            .delete(synchronize_session=False)
+        )
+        db_session.commit()
+    except Exception as e:
+        db_session.rollback()
+        return False, str(e)
+
+    return True, deleted
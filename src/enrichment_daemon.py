@@ -0,0 +1,245 @@
+
+import time
+import queue
+import logging
+import threading
+import itertools
+
+import config
+import rag_search_remote
+import enrichment_runs
+import enrichment_priority
+import embedding_versions
+import job_embedder
+from models_sql import Session, Job, EnrichmentRun
+
+log = logging.getLogger(__name__)
+
+# Summarizes and embeds newly ingested jobs in the background, so the interactive
+# "Enrich Jobs" / "Ask LLM" actions only have to process whatever is still missing.
+# One worker thread per process; it uses smaller worker pools than the interactive
+# path to leave LLM capacity for the user.
+# Jobs are taken in priority order (see enrichment_priority); prioritize() moves queued
+# jobs the user is looking at to the front.
+
+# (priority, sequence, job_id); an entry is stale once queued[job_id] holds a better priority
+job_queue = queue.PriorityQueue()
+sequence = itertools.count()
+
+# job_id -> best priority it is queued with
+queued = {}
+queued_lock = threading.Lock()
+
+worker_thread = None
+worker_lock = threading.Lock()
+
+
+def schedule(job_ids, priorities=None):
+    """
+    Queue external job ids for background enrichment.
+    priorities maps job_id -> priority; by default jobs keep their order at background priority.
+    """
+
+    if not config.background_enrichment or not job_ids:
+        return
+
+    priorities = priorities or enrichment_priority.get_priorities(job_ids)
+
+    with queued_lock:
+        for job_id in job_ids:
+            push(job_id, priorities[job_id])
+
+    start()
+
+
+def prioritize(priorities):
+    """
+    Raise the priority of jobs that are still waiting in the queue; other jobs are ignored.
+    """
+
+    with queued_lock:
+        for job_id, priority in priorities.items():
+            if job_id in queued:
+                push(job_id, priority)
+
+
+def push(job_id, priority):
+    """
+    Queue job_id unless it is already queued with the same or a better priority. Call with queued_lock held.
+    """
+
+    if job_id in queued and queued[job_id] <= priority:
+        return
+
+    queued[job_id] = priority
+    job_queue.put((priority, next(sequence), job_id))
+
+
+def start():
+
+    global worker_thread
+
+    with worker_lock:
+
+        if worker_thread and worker_thread.is_alive():
+            return
+
+        worker_thread = threading.Thread(target=worker_loop, name="enrichment-daemon", daemon=True)
+        worker_thread.start()
+
+
+def worker_loop():
+
+    while True:
+
+        job_ids = next_batch()
+
+        try:
+            enrich(job_ids)
+        except Exception as e:
+            log.exception(f"[EnrichmentDaemon] batch of {len(job_ids)} jobs failed: {e}")
+
+
+def next_batch():
+    """
+    Block for the most urgent job id, then take the next ones in priority order, up to the batch size.
+    Returns the job ids in priority order.
+    """
+
+    job_ids = []
+
+    while len(job_ids) < config.background_batch_size:
+
+        try:
+            entry = job_queue.get(block=not job_ids)
+        except queue.Empty:
+            break
+
+        priority, _, job_id = entry
+
+        with queued_lock:
+
+            # superseded by a later push with a better priority
+            if queued.get(job_id) != priority:
+                continue
+
+            del queued[job_id]
+
+        job_ids.append(job_id)
+
+    return job_ids
+
+
+def enrich(job_ids):
+
+    while not rag_search_remote.is_healthy():
+        log.warning(f"[EnrichmentDaemon] RAG-Search is not reachable, retrying in {config.background_retry_seconds}s")
+        time.sleep(config.background_retry_seconds)
+
+    with Session() as db_session:
+
+        jobs_not_summarized = (
+            db_session.query(Job)
+            .filter(Job.job_id.in_(job_ids), Job.is_summarized==False)
+            .all()
+        )
+
+        jobs_not_summarized = enrichment_priority.order_jobs(jobs_not_summarized, job_ids)
+
+        if jobs_not_summarized:
+
+            status, output = summarize_batch(db_session, jobs_not_summarized)
+            if not status:
+                log.warning(f"[EnrichmentDaemon] cannot summarize: {output}")
+                return
+
+            failed = output
+
+            log.info(f"[EnrichmentDaemon] summarized {len(jobs_not_summarized) - len(failed)}/{len(jobs_not_summarized)} jobs")
+
+        jobs_not_embedded = (
+            db_session.query(Job)
+            .filter(Job.job_id.in_(job_ids), Job.is_summarized==True, ~embedding_versions.is_embedded_clause())
+            .all()
+        )
+
+        jobs_not_embedded = enrichment_priority.order_jobs(jobs_not_embedded, job_ids)
+
+        if jobs_not_embedded:
+
+            status, output = embed_batch(db_session, jobs_not_embedded)
+
+            if not status:
+                log.warning(f"[EnrichmentDaemon] embedding failed: {output}")
+                return
+
+            log.info(f"[EnrichmentDaemon] embedded {len(jobs_not_embedded)} jobs")
+
+
+def summarize_batch(db_session, jobs):
+
+    status, output = job_embedder.prepare_summarization()
+    if not status:
+        return False, output
+
+    failed = job_embedder.summarize_job_batch(
+        db_session,
+        jobs,
+        output,
+        max_workers=config.background_workers,
+        on_warning=log.warning)
+
+    return True, failed
+
+
+def embed_batch(db_session, jobs):
+
+    return job_embedder.embed_job_batch(
+        db_session,
+        jobs,
+        max_workers=config.background_workers,
+        on_warning=log.warning)
+
+
+#################
+
+
+def schedule_retry(run_id, job_ids, delay):
+    """
+    Retry the failed items of an interactive enrichment run (see enrichment_runs) once
+    delay seconds have passed, and again after each backoff until none is retryable.
+    Returns False when background enrichment is disabled.
+    """
+
+    if not config.background_enrichment:
+        return False
+
+    timer = threading.Timer(delay, retry_run, args=(run_id, job_ids))
+    timer.daemon = True
+    timer.start()
+
+    return True
+
+
+def retry_run(run_id, job_ids):
+
+    try:
+        with Session() as db_session:
+
+            run = db_session.get(EnrichmentRun, run_id)
+            if not run:
+                return
+
+            job_embedder.enrich_run(db_session, run, job_ids, summarize_batch, embed_batch)
+
+            delay = enrichment_runs.next_retry_delay(db_session, run)
+            unfinished = enrichment_runs.finish_run(db_session, run)
+
+    except Exception as e:
+        log.exception(f"[EnrichmentDaemon] retry of run {run_id} failed: {e}")
+        return
+
+    log.info(f"[EnrichmentDaemon] retried run {run_id}, {len(unfinished)} items unfinished")
+
+    if delay is not None:
+        schedule_retry(run_id, job_ids, delay)
@@ -0,0 +1,59 @@
+# Order in which jobs are summarized and embedded: what the user is looking at first.
+# A priority is a (tier, position) tuple, lower is sooner:
+#   tier 0 - jobs whose card the user interacted with (opened company info, asked for a summary)
+#   tier 1 - favorite jobs
+#   tier 2 - visible jobs, by their position in the displayed list
+#   tier 3 - anything else, e.g. freshly ingested jobs nobody has looked at yet
+
+focused_tier = 0
+favorite_tier = 1
+visible_tier = 2
+background_tier = 3
+
+
+def get_priorities(job_ids, visible_job_ids=(), favorite_job_ids=(), focused_job_ids=()):
+    """
+    Returns a dict job_id -> priority for the external job ids.
+    """
+
+    visible_position = {job_id: idx for idx, job_id in enumerate(visible_job_ids)}
+    favorite_job_ids = set(favorite_job_ids)
+    focused_job_ids = list(focused_job_ids)
+
+    priorities = {}
+
+    for idx, job_id in enumerate(job_ids):
+
+        position = visible_position.get(job_id, len(visible_position) + idx)
+
+        if job_id in focused_job_ids:
+            # most recently focused first
+            priorities[job_id] = (focused_tier, -focused_job_ids.index(job_id))
+        elif job_id in favorite_job_ids:
+            priorities[job_id] = (favorite_tier, position)
+        elif job_id in visible_position:
+            priorities[job_id] = (visible_tier, position)
+        else:
+            priorities[job_id] = (background_tier, position)
+
+    return priorities
+
+
+def order_job_ids(job_ids, favorite_job_ids=(), focused_job_ids=()):
+    """
+    Sort job ids, given in display order, by priority.
+    """
+
+    priorities = get_priorities(job_ids, job_ids, favorite_job_ids, focused_job_ids)
+
+    return sorted(job_ids, key=priorities.get)
+
+
+def order_jobs(jobs, job_ids):
+    """
+    Sort Job rows by the position of their job_id in job_ids (already in priority order).
+    """
+
+    position = {job_id: idx for idx, job_id in enumerate(job_ids)}
+
+    return sorted(jobs, key=lambda job: position.get(job.job_id, len(position)))
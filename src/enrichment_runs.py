@@ -0,0 +1,207 @@
+
+import json
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+import config
+import embedding_versions
+from models_sql import Job, EnrichmentRun, EnrichmentRunItem
+
+# Checkpoints of interactive enrichment: one run per set of job ids, with the state of
+# every (job, stage) item. A run is resumed when the same set is enriched again, so
+# finished items are skipped and failed ones are retried with exponential backoff
+# until config.enrichment_max_attempts is reached. Every resume is a new user action and
+# gives unfinished items a fresh set of attempts.
+
+stages = ["summarize", "embed"]
+
+
+def get_done_ids(db_session, stage, jobs):
+    """
+    jobs.id of the jobs whose stage is complete: summarized, or embedded with the current
+    embedding model and chunker version.
+    """
+
+    if stage == "summarize":
+        return {job.id for job in jobs if job.is_summarized}
+
+    return embedding_versions.embedded_job_ids(db_session, [job.id for job in jobs])
+
+
+def compute_run_key(job_ids):
+
+    sorted_ids = sorted(job_ids)
+    hash_input = json.dumps(sorted_ids).encode("utf-8")
+    return hashlib.sha256(hash_input).hexdigest()[:16]  # 16-char ID
+
+
+def resume_run(db_session, job_ids):
+    """
+    Return the run for this set of job ids, creating it (and its items) if needed.
+    Items are reconciled with the job state (see get_done_ids), which remains the source of truth.
+    """
+
+    run_key = compute_run_key(job_ids)
+
+    run = db_session.query(EnrichmentRun).filter(EnrichmentRun.run_key == run_key).first()
+
+    if not run:
+        run = EnrichmentRun(run_key=run_key)
+        db_session.add(run)
+        db_session.flush()
+
+    jobs = db_session.query(Job).filter(Job.job_id.in_(job_ids)).all()
+
+    existing = {
+        (item.job_id, item.stage): item
+        for item in run.items
+    }
+
+    now = datetime.now(timezone.utc)
+
+    done_ids = {stage: get_done_ids(db_session, stage, jobs) for stage in stages}
+
+    for job in jobs:
+
+        for stage in stages:
+
+            item = existing.get((job.id, stage))
+
+            if not item:
+                item = EnrichmentRunItem(run=run, job_id=job.id, stage=stage)
+                db_session.add(item)
+
+            if job.id in done_ids[stage]:
+                item.state = "done"
+            elif item.state != "pending":
+                # the work was cleared since, the previous run stopped mid-item, or it failed
+                # (possibly out of attempts) and the user asked for it again
+                item.state = "pending"
+                item.attempts = 0
+                item.next_attempt_at = None
+
+            item.updated_at = now
+
+    run.status = "running"
+    run.updated_at = now
+
+    db_session.commit()
+
+    return run
+
+
+def due_jobs(db_session, run, stage):
+    """
+    Jobs of the run whose item for stage is pending, or failed and due for another attempt.
+    Embedding only becomes due once the job is summarized.
+    """
+
+    now = datetime.now(timezone.utc)
+
+    query = (
+        db_session.query(Job)
+        .join(EnrichmentRunItem, EnrichmentRunItem.job_id == Job.id)
+        .filter(
+            EnrichmentRunItem.run_id == run.id,
+            EnrichmentRunItem.stage == stage,
+            EnrichmentRunItem.state.in_(("pending", "failed")),
+            EnrichmentRunItem.attempts < config.enrichment_max_attempts,
+            (EnrichmentRunItem.next_attempt_at == None) | (EnrichmentRunItem.next_attempt_at <= now))
+    )
+
+    if stage == "embed":
+        query = query.filter(Job.is_summarized == True)
+
+    return query.all()
+
+
+def get_items(db_session, run, stage, jobs):
+
+    return (
+        db_session.query(EnrichmentRunItem)
+        .filter(
+            EnrichmentRunItem.run_id == run.id,
+            EnrichmentRunItem.stage == stage,
+            EnrichmentRunItem.job_id.in_([job.id for job in jobs]))
+        .all()
+    )
+
+
+def mark_running(db_session, run, stage, jobs):
+
+    now = datetime.now(timezone.utc)
+
+    for item in get_items(db_session, run, stage, jobs):
+        item.state = "running"
+        item.attempts += 1
+        item.updated_at = now
+
+    db_session.commit()
+
+
+def record_results(db_session, run, stage, jobs, errors):
+    """
+    Close the running items of jobs: done when the stage is complete for the job,
+    otherwise failed with the error from errors (keyed by external job_id) and a backoff.
+    """
+
+    now = datetime.now(timezone.utc)
+
+    jobs_by_id = {job.id: job for job in jobs}
+    done_ids = get_done_ids(db_session, stage, jobs)
+
+    for item in get_items(db_session, run, stage, jobs):
+
+        job = jobs_by_id[item.job_id]
+        item.updated_at = now
+
+        if job.id in done_ids:
+            item.state = "done"
+            item.last_error = None
+            item.next_attempt_at = None
+            continue
+
+        item.state = "failed"
+        item.last_error = str(errors.get(job.job_id, "not completed"))
+        item.next_attempt_at = now + timedelta(seconds=config.enrichment_retry_backoff * 2 ** (item.attempts - 1))
+
+    db_session.commit()
+
+
+def next_retry_delay(db_session, run):
+    """
+    Seconds until the next failed item may be retried, or None when nothing is retryable.
+    """
+
+    item = (
+        db_session.query(EnrichmentRunItem)
+        .filter(
+            EnrichmentRunItem.run_id == run.id,
+            EnrichmentRunItem.state == "failed",
+            EnrichmentRunItem.attempts < config.enrichment_max_attempts)
+        .order_by(EnrichmentRunItem.next_attempt_at)
+        .first()
+    )
+
+    if not item:
+        return None
+
+    if not item.next_attempt_at:
+        return 0
+
+    return max(0.0, (item.next_attempt_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def finish_run(db_session, run):
+    """
+    Set the final run status; returns the items that did not complete.
+    """
+
+    unfinished = [item for item in run.items if item.state != "done"]
+
+    run.status = "failed" if unfinished else "done"
+    run.updated_at = datetime.now(timezone.utc)
+
+    db_session.commit()
+
+    return unfinished
@@ -0,0 +1,71 @@
+
+import time
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+
+    def __init__(self, probe, ttl=15):
+        """
+        :param probe: callable returning True when the remote service is up
+        :param ttl: seconds a probe result is served from cache
+        """
+
+        self.probe = probe
+        self.ttl = ttl
+
+        self.healthy = None
+        self.checked_at = 0.0
+
+        self.lock = threading.Lock()
+        self.refreshing = False
+
+
+    def is_healthy(self):
+
+        if self.healthy is None:
+            return self.refresh()
+
+        if not self.is_stale():
+            return self.healthy
+
+        # stale: re-probe a healthy service in the background, a failing one right away
+        if self.healthy:
+            self.refresh_in_background()
+            return True
+
+        return self.refresh()
+
+
+    def is_stale(self):
+
+        return time.monotonic() - self.checked_at > self.ttl
+
+
+    def refresh(self):
+
+        try:
+            healthy = bool(self.probe())
+        except Exception as e:
+            log.warning(f"[HealthMonitor] probe failed: {e}")
+            healthy = False
+
+        with self.lock:
+            self.healthy = healthy
+            self.checked_at = time.monotonic()
+            self.refreshing = False
+
+        return healthy
+
+
+    def refresh_in_background(self):
+
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+
+        threading.Thread(target=self.refresh, daemon=True).start()
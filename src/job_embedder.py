@@ -1,15 +1,33 @@
 
-import hashlib
-import json
 import re
+import logging
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
+from sqlalchemy.dialects.postgresql import insert
 
 import config
 import rag_search_remote
-from models_sql import Session, Job, JobEmbedding
-
-
-summarization_job_prompt = """
+import model_registry
+import collection_manager
+import summary_cache
+import embedding_cache
+import embedding_versions
+import token_counter
+import text_splitter
+import enrichment_runs
+import enrichment_priority
+import enrichment_daemon
+import structured_summary
+from write_buffer import WriteBehindBuffer
+from job_leases import JobLeases
+from models_sql import Session, Job, JobEmbedding, JobSkill, CollectionJob
+
+log = logging.getLogger(__name__)
+
+
+summarization_instructions = """
 You are an intelligent and helpful career assistant trained to extract key insights from job postings to help candidates quickly assess fit and interest.
 
 Given the following job posting, extract and summarize the following structured information:
@@ -24,18 +42,50 @@ Given the following job posting, extract and summarize the following structured
 - Be concise and use bullet points where appropriate.
 - Use professional language suitable for job seekers comparing roles.
 - Ensure accuracy and do not assume unlisted technologies or details.
+""" + structured_summary.structured_summary_prompt
 
+summarization_job_prompt = summarization_instructions + """
 Here is the job text:
 """
 
+summarization_pack_prompt = summarization_instructions + """
+The text below contains several job postings, each starting with a line "=== JOB <n> ===".
+Summarize every posting on its own, in the same order, and start each summary with a line "=== SUMMARY <n> ===" carrying the number of its posting.
+Do not write anything before the first summary.
+
+Here are the job texts:
+"""
+
+pack_job_delimiter = "=== JOB {} ==="
+pack_summary_pattern = re.compile(r"^[ \t]*=+[ \t]*SUMMARY[ \t]+(\d+)[ \t]*=+[ \t]*$", re.MULTILINE)
+
+summarization_chunk_prompt = """
+You are helping summarize a job posting that is too long to read at once, so it was split into parts.
+
+From the part below, extract as concise bullet points every fact about:
+- responsibilities and objectives of the role
+- experience level or seniority
+- required skills, technologies, tools, programming languages and frameworks
+- preferred experience or qualifications
+- benefits, perks, or noteworthy aspects of the company or role
+
+Only use what is stated in this part. Skip anything else.
+
+This is part {part} of {parts}:
+"""
+
+# bump whenever summarization_job_prompt changes, so cached summaries are not reused
+summarization_prompt_version = 2
+
+# a job section trimmed below this many tokens is dropped instead
+min_section_tokens = 32
+
 
 def summarize_and_embed(job_ids_to_process):
 
     if not rag_search_remote.is_healthy():
         return False, "RAG-Search is not reachable"
 
-    batch_id = compute_batch_id(job_ids_to_process)
-
     db_session = Session()
 
     ################
@@ -44,132 +94,642 @@ def summarize_and_embed(job_ids_to_process):
     if not status:
         return False, output
 
-    status, output = rag_search_remote.get_collections()
-    if not status:
-        return False, f"get_collections error: {output}"
+    ################
 
-    existing_collections = output
+    collection_name = get_collection_name(config.embed_model)
 
-    ################
+    status, output = ensure_collection(db_session, collection_name)
+    if not status:
+        return False, output
 
-    collection_name = f"jobs_{config.embed_model}_{batch_id}"
-    collection_name = re.sub(r"[^a-zA-Z0-9_-]", "_", collection_name)
+    indexed_job_ids = (
+        db_session.query(CollectionJob.job_id)
+        .filter(CollectionJob.collection_name == collection_name)
+    )
 
-    if collection_name not in existing_collections:
+    jobs_not_indexed = (
+        db_session.query(Job)
+        .filter(Job.job_id.in_(job_ids_to_process), embedding_versions.is_embedded_clause(), Job.id.notin_(indexed_job_ids))
+        .all()
+    )
+
+    if jobs_not_indexed:
 
         status, output = store_embedding(
             db_session,
-            batch_id,
             collection_name,
-            job_ids_to_process)
+            jobs_not_indexed)
 
         if not status:
             return False, output
 
     ################
 
+    status, output = collection_manager.maybe_collect_garbage(db_session, keep=[collection_name])
+    if not status:
+        st.warning(f"Collection clean-up failed: {output}")
+
+    ################
+
     return True, None
 
 
-def compute_batch_id(job_ids_to_process: list[str]) -> str:
+def get_collection_name(embed_model):
+    """
+    One long-lived collection per embedding model and chunker version; queries are restricted
+    to the visible jobs by a metadata filter.
+    """
+
+    collection_name = f"jobs_{embed_model}_v{text_splitter.chunker_version}"
+    return re.sub(r"[^a-zA-Z0-9_-]", "_", collection_name)
+
+
+def ensure_collection(db_session, collection_name):
+
+    status, output = rag_search_remote.get_collections()
+    if not status:
+        return False, f"get_collections error: {output}"
+
+    if collection_name in output:
+        return True, None
 
-    sorted_ids = sorted(job_ids_to_process)
-    hash_input = json.dumps(sorted_ids).encode("utf-8")
-    return hashlib.sha256(hash_input).hexdigest()[:16]  # 16-char ID
+    # the collection is missing on the server, so nothing recorded as indexed in it is there anymore
+    db_session.query(CollectionJob).filter(
+        CollectionJob.collection_name == collection_name).delete(synchronize_session=False)
+    db_session.commit()
+
+    status, output = rag_search_remote.create_collection(
+        collection_name,
+        config.embed_model)
+
+    if not status:
+        return False, f"create_collection error: {output}"
+
+    return True, None
 
 
 def summarize_and_embed_jobs(db_session, job_ids_to_process):
+    """
+    Summarize and embed the jobs as a resumable run: jobs finished by an earlier run are
+    skipped, failed ones are retried with backoff by the enrichment daemon, and one failing
+    job does not stop the rest. Jobs are processed in the order of job_ids_to_process
+    (see enrichment_priority).
+    """
 
-    jobs_not_summarized = (
-        db_session.query(Job)
-        .filter(Job.job_id.in_(job_ids_to_process), Job.is_summarized==False)
-        .all()
-    )
+    run = enrichment_runs.resume_run(db_session, job_ids_to_process)
 
-    if jobs_not_summarized:
+    enrich_run(db_session, run, job_ids_to_process, summarize_jobs, embed_jobs)
 
-        status, output = summarize_jobs(db_session, jobs_not_summarized)
-        if not status:
-            return False, output
+    # failed items are retried by the daemon after their backoff instead of blocking the page
+    delay = enrichment_runs.next_retry_delay(db_session, run)
+    retrying = delay is not None and enrichment_daemon.schedule_retry(run.id, job_ids_to_process, delay)
 
     ################
 
-    jobs_not_embedded = (
-        db_session.query(Job)
-        .filter(Job.job_id.in_(job_ids_to_process), Job.is_summarized==True, Job.is_embedded==False)
-        .all()
-    )
+    unfinished = enrichment_runs.finish_run(db_session, run)
 
-    if jobs_not_embedded:
+    if unfinished:
 
-        status, output = embed_jobs(db_session, jobs_not_embedded)
-        if not status:
-            return False, output
+        unfinished_job_ids = {item.job_id for item in unfinished}
 
-    ################
+        if len(unfinished_job_ids) == len({item.job_id for item in run.items}):
+            error = next((item.last_error for item in unfinished if item.last_error), "no job could be processed")
+            if retrying:
+                error += f" (retrying in the background in {delay:.0f}s)"
+            return False, f"Enrichment failed for all jobs: {error}"
+
+        failed_jobs = {item.job.title: item.last_error for item in unfinished if item.last_error}
+
+        st.warning(
+            f"{len(unfinished_job_ids)} of {len(job_ids_to_process)} jobs could not be enriched "
+            f"and are skipped. "
+            + (f"They are retried in the background in {delay:.0f}s, or run again to resume them now.\n\n"
+               if retrying else "Run again to resume them.\n\n")
+            + "\n".join(f"- {title}: {error}" for title, error in failed_jobs.items()))
 
     return True, None
 
 
+def enrich_run(db_session, run, job_ids_to_process, summarize, embed):
+    """
+    One attempt at every item of the run that is due. summarize and embed are called with
+    (db_session, jobs) and return (True, errors by job_id) or (False, error for all jobs).
+    """
+
+    for stage, process in (("summarize", summarize), ("embed", embed)):
+
+        jobs = enrichment_runs.due_jobs(db_session, run, stage)
+        jobs = enrichment_priority.order_jobs(jobs, job_ids_to_process)
+
+        if not jobs:
+            continue
+
+        enrichment_runs.mark_running(db_session, run, stage, jobs)
+
+        try:
+            status, output = process(db_session, jobs)
+        except Exception as e:
+            # e.g. a database error while writing back; the items must not stay "running"
+            log.exception(f"[JobEmbedder] {stage} of {len(jobs)} jobs failed: {e}")
+            db_session.rollback()
+            status, output = False, str(e)
+
+        errors = output if status else {job.job_id: output for job in jobs}
+
+        enrichment_runs.record_results(db_session, run, stage, jobs, errors or {})
+
+
 def summarize_jobs(db_session, jobs_not_summarized):
 
-    status, output = rag_search_remote.get_llm_models()
+    status, output = prepare_summarization()
     if not status:
         return False, output
 
-    existing_models = output
-
-    if config.llm_model_summarization not in existing_models:
-        return False, f"LLM model {config.llm_model_summarization} not loaded."
+    context_length_tokens = output
 
     #############
 
-    status, output = get_max_characters_llm(config.llm_model_summarization)
+    with st.status("Start Summarization...", expanded=True) as st_status:
+
+        st.write(f"Summarizing {len(jobs_not_summarized)} jobs with {config.llm_model_summarization} "
+                 f"({config.summarization_workers} in parallel)...")
+
+        progress_bar = st.progress(0.0)
+
+        def on_progress(completed, total, job, error):
+            progress_bar.progress(completed / total, text=f"{completed}/{total} jobs summarized")
+            if error:
+                st.write(f"⚠️ {job.title}: {error}")
+
+        failed = summarize_job_batch(
+            db_session,
+            jobs_not_summarized,
+            context_length_tokens,
+            on_progress=on_progress,
+            on_warning=st.warning)
+
+        if len(failed) == len(jobs_not_summarized):
+            st_status.update(label="Summarization failed", state="error", expanded=True)
+            return False, f"Summarization failed for all jobs: {next(iter(failed.values()))}"
+
+        if failed:
+            st_status.update(label=f"Summarization complete ({len(failed)} failed)", state="complete", expanded=False)
+        else:
+            st_status.update(label="Summarization complete", state="complete", expanded=False)
+
+    # job_id -> error of the jobs that failed
+    return True, failed
+
+
+def prepare_summarization():
+    """
+    Check the summarization model is available; returns (True, context length in tokens).
+    """
+
+    status, output = model_registry.has_llm_model(config.llm_model_summarization)
     if not status:
-        return False, f"get_max_characters_llm: {output}"
+        return False, output
 
-    context_length_characters = int(output)
+    if not output:
+        return False, f"LLM model {config.llm_model_summarization} not loaded."
 
-    #############
+    status, output = get_context_length_llm(config.llm_model_summarization)
+    if not status:
+        return False, f"get_context_length_llm: {output}"
 
-    global summarization_job_prompt
+    return True, output
 
-    with st.status("Start Summarization...", expanded=True) as st_status:
 
-        st.write(f"Summarizing {len(jobs_not_summarized)} jobs with {config.llm_model_summarization}...")
+def summarize_job_batch(db_session, jobs, context_length_tokens, max_workers=None, on_progress=None, on_warning=None):
+    """
+    Summarize the jobs this worker can lease (see JobLeases).
+    Jobs summarized by another worker in the meantime are reloaded instead of redone;
+    jobs still leased elsewhere after waiting are reported as failed.
+    Returns a dict job_id -> error for the jobs that failed.
+    """
 
-        for job in jobs_not_summarized:
+    with JobLeases("summarize") as leases:
 
-            summarization_prompt_final = summarization_job_prompt + "\n\n" + extract_job(job)
+        jobs, failed = lease_jobs(db_session, leases, jobs, Job.is_summarized == True)
 
-            if len(summarization_prompt_final) > context_length_characters:
+        failed.update(summarize_leased_jobs(
+            db_session,
+            jobs,
+            context_length_tokens,
+            max_workers=max_workers,
+            on_progress=on_progress,
+            on_warning=on_warning))
 
-                summarization_prompt_final = summarization_job_prompt + "\n\n" + extract_job(job, include_highlights=False)
+    return failed
 
-                if len(summarization_prompt_final) > context_length_characters:
-                    st.warning(f"job text length exceeds maximum context length {context_length_characters}")
 
-            status, final_summary = rag_search_remote.llm_chat(
-                summarization_prompt_final,
-                config.llm_model_summarization,
-                session_id="llm_job_summary")
+def lease_jobs(db_session, leases, jobs, done_clause):
+    """
+    Lease jobs and drop those another worker finished (done_clause holds) before we got the lease.
+    Returns (leased jobs still to do, job_id -> error for the jobs that stayed busy).
+    """
 
-            if not status:
-                return False, final_summary
+    acquired, busy = leases.acquire([job.id for job in jobs])
 
-            job_header_str = extract_job(job, include_body=False)
-            job.job_summary = job_header_str + "\n\n" + final_summary
-            job.is_summarized = True
+    done_ids = {
+        job_id for (job_id,) in
+        db_session.query(Job.id).filter(Job.id.in_(acquired), done_clause)
+    }
 
-            db_session.add(job)
-            db_session.commit()
+    todo = []
 
-        st_status.update(label="Summarization complete", state="complete", expanded=False)
+    for job in jobs:
+        if job.id in done_ids:
+            db_session.refresh(job)
+        elif job.id not in busy:
+            todo.append(job)
 
-    return True, None
+    failed = {
+        job.job_id: f"{leases.stage} is still running in another worker"
+        for job in jobs if job.id in busy
+    }
+
+    return todo, failed
+
+
+def summarize_leased_jobs(db_session, jobs, context_length_tokens, max_workers=None, on_progress=None, on_warning=None):
+    """
+    Summarize jobs concurrently on a bounded worker pool.
+
+    Jobs whose normalized text is already in the summary cache are filled in without an
+    LLM call, and jobs sharing the same text within the batch are summarized once.
+    Short jobs are packed several per LLM request (see build_summarization_requests).
+    Only the LLM calls run in worker threads; prompts are built and results are written
+    back on the calling thread, in the order the requests were planned, and committed in
+    batches through a WriteBehindBuffer.
+    A failing job does not stop the others.
+
+    on_progress(completed, total, job, error) and on_warning(message) are called on the
+    calling thread. Returns a dict job_id -> error for the jobs that failed.
+    """
+
+    max_workers = max_workers or config.summarization_workers
+
+    # content key -> jobs with that text, in first-appearance order
+    groups = {}
+
+    for job in jobs:
+        key = summary_cache.get_key(extract_job(job), config.llm_model_summarization, summarization_prompt_version)
+        groups.setdefault(key, []).append(job)
+
+    cached = summary_cache.lookup(db_session, list(groups.keys()))
+
+    with WriteBehindBuffer(db_session) as write_buffer:
+
+        failed = {}
+        completed = 0
+
+        for key, group in groups.items():
+
+            if key in cached:
+
+                apply_summary(write_buffer, group, cached[key])
+
+                completed += len(group)
+                if on_progress:
+                    on_progress(completed, len(jobs), group[0], None)
+
+        pending = [key for key in groups if key not in cached]
+
+        # prepared on this thread (ORM access), run on the worker pool
+        # every LLM call of the batch, including map-reduce chunks, takes one of max_workers slots
+        llm_slots = threading.BoundedSemaphore(max_workers)
+
+        def chat(*args, **kwargs):
+            with llm_slots:
+                return rag_search_remote.llm_chat(*args, **kwargs)
+
+        requests = build_summarization_requests(
+            [groups[key][0] for key in pending],
+            context_length_tokens,
+            on_warning,
+            chat)
+
+        results = {}
+        next_to_write = 0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            futures = {executor.submit(task): idx for idx, (_, task) in enumerate(requests)}
+
+            for future in as_completed(futures):
+
+                idx = futures[future]
+
+                try:
+                    results[idx] = future.result()
+                except Exception as e:
+                    results[idx] = [(False, str(e))] * len(requests[idx][0])
+
+                # write back in order: hand over every finished request that precedes any pending one
+                while next_to_write in results:
+
+                    for pos, (status, output) in zip(requests[next_to_write][0], results.pop(next_to_write)):
+
+                        key = pending[pos]
+
+                        if status:
+                            summary_cache.store(
+                                db_session,
+                                key,
+                                config.llm_model_summarization,
+                                summarization_prompt_version,
+                                output)
+                            apply_summary(write_buffer, groups[key], output)
+                        else:
+                            for job in groups[key]:
+                                failed[job.job_id] = output
+
+                        # progress is reported as results are written back, with their own outcome
+                        completed += len(groups[key])
+
+                        if on_progress:
+                            on_progress(completed, len(jobs), groups[key][0], None if status else output)
+
+                    next_to_write += 1
+
+                write_buffer.flush_if_due()
+
+    return failed
+
+
+def apply_summary(write_buffer, jobs, summary):
+
+    markdown, fields = structured_summary.parse_summary(summary)
+
+    for job in jobs:
+
+        job.job_summary = extract_job(job, include_body=False) + "\n\n" + markdown
+        job.is_summarized = True
+
+        if fields:
+            job.seniority = fields["seniority"]
+            job.remote_policy = fields["remote_policy"]
+            job.min_years_experience = fields["min_years_experience"]
+            job.skills = [
+                JobSkill(skill=skill)
+                for skill in {structured_summary.normalize_skill(skill) for skill in fields["skills"]}
+            ]
+
+    write_buffer.add(*jobs)
+
+
+def build_summarization_requests(jobs, context_length_tokens, on_warning=None, chat=rag_search_remote.llm_chat):
+    """
+    Plan the LLM requests that summarize jobs.
+    Returns a list of (positions, task): task() gives one (status, summary) per job at
+    those positions of jobs. Short jobs are packed up to config.summarization_pack_size
+    per request; the others get a request of their own.
+    chat is the function that sends one LLM request (rag_search_remote.llm_chat's signature).
+    """
+
+    llm_model = config.llm_model_summarization
+
+    pack_budget = (
+        context_length_tokens
+        - token_counter.count_tokens(summarization_pack_prompt + "\n\n", llm_model)
+    )
+
+    requests = []
+    pack = []  # (position, job_text, single-job task)
+    pack_tokens = 0
+
+    def close_pack():
+
+        if len(pack) == 1:
+            position, _, task = pack[0]
+            requests.append(([position], lambda task=task: [task()]))
+        elif pack:
+            positions, job_texts, fallbacks = zip(*pack)
+            session_id = f"llm_job_summary_pack_{jobs[positions[0]].job_id}"
+            requests.append((list(positions), partial(summarize_packed, job_texts, fallbacks, session_id, chat)))
+
+        pack.clear()
+
+    for pos, job in enumerate(jobs):
+
+        task = build_summarization_task(job, context_length_tokens, on_warning, chat)
+
+        job_text = extract_job(job)
+        tokens = token_counter.count_tokens(job_text, llm_model) + config.summary_output_tokens
 
+        if config.summarization_pack_size <= 1 or tokens - config.summary_output_tokens > config.summarization_pack_job_tokens:
+            requests.append(([pos], lambda task=task: [task()]))
+            continue
 
-def get_max_characters_llm(llm_model):
+        if len(pack) >= config.summarization_pack_size or pack_tokens + tokens > pack_budget:
+            close_pack()
+            pack_tokens = 0
+
+        pack.append((pos, job_text, task))
+        pack_tokens += tokens
+
+    close_pack()
+
+    return requests
+
+
+def summarize_packed(job_texts, fallbacks, session_id, chat=rag_search_remote.llm_chat):
+    """
+    Summarize several jobs in one LLM request and split the answer per job.
+    If the answer cannot be split, every job is summarized on its own with its fallback task.
+    Runs on a worker thread; no ORM access.
+    """
+
+    prompt = summarization_pack_prompt + "\n\n" + "\n\n".join(
+        pack_job_delimiter.format(idx + 1) + "\n" + job_text
+        for idx, job_text in enumerate(job_texts)
+    )
+
+    status, output = chat(prompt, config.llm_model_summarization, session_id=session_id)
+
+    summaries = parse_packed_summaries(output, len(job_texts)) if status else None
+
+    if summaries is None:
+        return [task() for task in fallbacks]
+
+    return [(True, summary) for summary in summaries]
+
+
+def parse_packed_summaries(llm_output, count):
+    """
+    Split a packed answer on its "=== SUMMARY <n> ===" lines.
+    Returns the summaries in job order, or None unless each of 1..count appears once with text.
+    """
+
+    if not isinstance(llm_output, str):
+        return None
+
+    markers = list(pack_summary_pattern.finditer(llm_output))
+
+    if [int(marker.group(1)) for marker in markers] != list(range(1, count + 1)):
+        return None
+
+    summaries = []
+
+    for idx, marker in enumerate(markers):
+
+        end = markers[idx + 1].start() if idx + 1 < len(markers) else len(llm_output)
+        summary = llm_output[marker.end():end].strip()
+
+        if not summary:
+            return None
+
+        summaries.append(summary)
+
+    return summaries
+
+
+def build_summarization_task(job, context_length_tokens, on_warning=None, chat=rag_search_remote.llm_chat):
+    """
+    Returns a callable giving (status, summary) for the job: one LLM request, or a
+    map-reduce over the description when the description alone exceeds the context.
+    """
+
+    header = extract_job_header(job)
+    sections = extract_job_sections(job)
+    session_id = f"llm_job_summary_{job.job_id}"
+
+    if needs_map_reduce(header, sections, context_length_tokens):
+
+        chunks = split_description(job.description or "", get_chunk_budget(context_length_tokens, header))
+
+        return partial(summarize_map_reduce, header, sections, chunks, context_length_tokens, session_id, chat)
+
+    prompt, fits = build_summarization_prompt(header, sections, context_length_tokens)
+    if not fits and on_warning:
+        on_warning(f"{job.title}: job text exceeds maximum context length of {context_length_tokens} tokens")
+
+    return partial(chat, prompt, config.llm_model_summarization, session_id=session_id)
+
+
+def get_prompt_budget(context_length_tokens):
+
+    return (
+        context_length_tokens
+        - token_counter.count_tokens(summarization_job_prompt + "\n\n", config.llm_model_summarization)
+        - config.summary_output_tokens
+    )
+
+
+def build_summarization_prompt(header, sections, context_length_tokens):
+    """
+    Returns (prompt, fits) where fits is False if the prompt is still over the context length.
+    """
+
+    budget = get_prompt_budget(context_length_tokens)
+
+    job_text, fits = fit_job_text(header, sections, budget, config.llm_model_summarization)
+
+    return summarization_job_prompt + "\n\n" + job_text, fits
+
+
+def fit_job_text(header, sections, max_tokens, model_name):
+    """
+    Render the job within max_tokens of model_name, trimming the body section by section:
+    highlights first (they restate the description), then benefits, then the description.
+    Returns (job_text, fits).
+    """
+
+    sections = dict(sections)
+
+    def render():
+        parts = header + list(sections.values())
+        return "\n".join(part for part in parts if part.strip())
+
+    for name in ("highlights", "benefits", "description"):
+
+        while sections[name]:
+
+            overflow = token_counter.count_tokens(render(), model_name) - max_tokens
+            if overflow <= 0:
+                return render(), True
+
+            keep = token_counter.count_tokens(sections[name], model_name) - overflow
+
+            if keep < min_section_tokens:
+                sections[name] = ""
+            else:
+                sections[name] = token_counter.truncate_to_tokens(sections[name], keep, model_name)
+
+    job_text = render()
+
+    return job_text, token_counter.count_tokens(job_text, model_name) <= max_tokens
+
+#############
+
+def needs_map_reduce(header, sections, context_length_tokens):
+
+    header_and_description = "\n".join(header + [sections["description"]])
+
+    tokens = token_counter.count_tokens(header_and_description, config.llm_model_summarization)
+
+    return tokens > get_prompt_budget(context_length_tokens)
+
+
+def get_chunk_budget(context_length_tokens, header):
+    """
+    Tokens left for a description chunk once the chunk prompt, the job header repeated
+    with every chunk, and the output are accounted for.
+    """
+
+    # worst case for the part numbers filled in later
+    prompt_prefix = summarization_chunk_prompt.format(part=999, parts=999) + "\n\n" + "\n".join(header) + "\n\n"
+
+    return (
+        context_length_tokens
+        - token_counter.count_tokens(prompt_prefix, config.llm_model_summarization)
+        - config.summary_output_tokens
+    )
+
+
+def split_description(text, max_tokens):
+    """
+    Split text into pieces of at most max_tokens, on paragraph, then line, then word boundaries.
+    """
+
+    return text_splitter.split_text(text, max_tokens, config.llm_model_summarization)
+
+
+def summarize_map_reduce(header, sections, chunks, context_length_tokens, session_id, chat=rag_search_remote.llm_chat):
+    """
+    Map: extract the relevant facts of every description chunk in parallel.
+    Reduce: summarize the job with the extracted facts in place of the description.
+    Runs on a worker thread; no ORM access. All calls go through chat, so they share the
+    batch's LLM slots instead of adding map_reduce_workers requests on top of them.
+    """
+
+    job_header = "\n".join(header)
+
+    def summarize_chunk(item):
+        idx, chunk = item
+        prompt = summarization_chunk_prompt.format(part=idx + 1, parts=len(chunks)) + "\n\n" + job_header + "\n\n" + chunk
+        return chat(prompt, config.llm_model_summarization, session_id=f"{session_id}_part{idx + 1}")
+
+    with ThreadPoolExecutor(max_workers=config.map_reduce_workers) as executor:
+        results = list(executor.map(summarize_chunk, enumerate(chunks)))
+
+    notes = []
+
+    for idx, (status, output) in enumerate(results):
+        if not status:
+            return False, f"summarizing part {idx + 1}/{len(chunks)} failed: {output}"
+        notes.append(f"Part {idx + 1}:\n{output}")
+
+    sections = dict(sections)
+    sections["description"] = f"Job Description (condensed from {len(chunks)} parts):\n" + "\n\n".join(notes)
+
+    prompt, _ = build_summarization_prompt(header, sections, context_length_tokens)
+
+    return chat(prompt, config.llm_model_summarization, session_id=session_id)
+
+
+def get_context_length_llm(llm_model):
 
     status, output = rag_search_remote.get_llm_info(llm_model)
     if not status:
@@ -179,10 +739,7 @@ def get_max_characters_llm(llm_model):
     if not context_len:
         return False, f"cannot get context length of LLM model {llm_model}"
 
-    avg_chars_per_token = 3.5  # in English
-    approx_max_characters = int(context_len) * avg_chars_per_token
-
-    return True, int(approx_max_characters)
+    return True, int(context_len)
 
 
 def extract_job(job, include_header=True, include_body=True, include_highlights=True):
@@ -213,11 +770,23 @@ def extract_job_header(job):
 
 def extract_job_body(job, include_highlights=True):
 
-    parts = []
+    sections = extract_job_sections(job)
+
+    if not include_highlights:
+        sections.pop("highlights")
 
-    parts.append(f"Job Description: {job.description or 'N/A'}")
+    return [part for part in sections.values() if part]
 
-    if include_highlights and job.job_highlights:
+
+def extract_job_sections(job):
+
+    sections = {
+        "description": f"Job Description: {job.description or 'N/A'}",
+        "highlights": "",
+        "benefits": f"Job Benefits: {job.job_benefits or 'N/A'}"
+    }
+
+    if job.job_highlights:
 
         highlights = "\n".join([
             f"{section}: {', '.join(items)}"
@@ -225,137 +794,300 @@ def extract_job_body(job, include_highlights=True):
             if items  # skip empty lists
         ])
 
-        parts.append(f"Job Highlights:\n{highlights}")
+        sections["highlights"] = f"Job Highlights:\n{highlights}"
 
-    parts.append(f"Job Benefits: {job.job_benefits or 'N/A'}")
-
-    return parts
+    return sections
 
 
 def embed_jobs(db_session, jobs_not_embedded):
 
     with st.status("Start Embedding...", expanded=True) as st_status:
 
-        st.write(f"Loading embedding model: {config.embed_model}...")
+        if not model_registry.is_loaded(config.embed_model):
+            st.write(f"Loading embedding model: {config.embed_model}...")
 
-        status, output = rag_search_remote.load_model([config.embed_model])
-        if not status:
-            return False, f"Cannot load model: {output}"
+        st.write(f"Embedding {len(jobs_not_embedded)} jobs...")
 
-        ################
+        def on_progress(completed, total):
+            st.write(f"{completed}/{total} jobs embedded")
+
+        status, output = embed_job_batch(
+            db_session,
+            jobs_not_embedded,
+            on_progress=on_progress,
+            on_warning=st.warning)
 
-        status, output = get_max_characters_embedding(config.embed_model)
         if not status:
             return False, output
 
-        chunk_size = output
-
         ################
 
-        st.write(f"Embedding {len(jobs_not_embedded)} jobs...")
+        st_status.update(label="Embedding done!", state="complete", expanded=False)
+
+    # job_id -> error of the jobs that were skipped
+    return True, output
+
+
+def embed_job_batch(db_session, jobs, max_workers=None, on_progress=None, on_warning=None):
+    """
+    Embed the jobs this worker can lease (see JobLeases).
+    Jobs embedded by another worker in the meantime are reloaded instead of redone.
+    """
+
+    with JobLeases("embed") as leases:
+
+        jobs, skipped = lease_jobs(db_session, leases, jobs, embedding_versions.is_embedded_clause())
 
-        for job in jobs_not_embedded:
+        if skipped and on_warning:
+            on_warning(f"{len(skipped)} jobs are being embedded by another worker and are skipped.")
 
-            status, output = rag_search_remote.get_embedding(
-                job.job_summary,
-                config.embed_model,
-                chunk_size=chunk_size
-            )
+        if jobs:
+
+            status, output = embed_leased_jobs(
+                db_session,
+                jobs,
+                max_workers=max_workers,
+                on_progress=on_progress,
+                on_warning=on_warning)
 
             if not status:
-                return False, f"Embedding error: {output}"
+                return False, output
 
-            vectors = output.get("vectors", [])
-            chunk_text = output.get("chunk_text", [])
+            skipped.update(output)
+
+    # job_id -> error of the jobs that were skipped
+    return True, skipped
 
-            if len(vectors) != len(chunk_text):
-                st.warning("Mismatch between number of vectors and chunk texts.")
-                continue
 
-            for idx, (vector, text) in enumerate(zip(vectors, chunk_text)):
+def embed_leased_jobs(db_session, jobs, max_workers=None, on_progress=None, on_warning=None):
+    """
+    Embed the summaries of jobs chunk by chunk and store the vectors.
 
-                db_session.add(JobEmbedding(
+    Summaries are split locally (text_splitter) within the model's token limit; chunks found
+    in the embedding cache are reused and only the missing ones, deduplicated across jobs,
+    are sent to one request pool. A job is written as soon as all its chunks have vectors;
+    a chunk that fails only fails the jobs containing it.
+    Safe to call off the Streamlit thread: on_progress(completed, total) and
+    on_warning(message) are the only side channels.
+    Returns (True, job_id -> error) for the jobs that were not embedded.
+    """
+
+    status, output = model_registry.ensure_loaded([config.embed_model])
+    if not status:
+        return False, f"Cannot load model: {output}"
+
+    status, output = rag_search_remote.get_max_tokens(config.embed_model)
+    if not status:
+        return False, f"cannot get embedding model max tokens: {output}"
+
+    # the server adds special tokens (e.g. [CLS] / [SEP]) to every chunk
+    max_tokens = output - config.embed_token_reserve
+
+    chunks_by_job = text_splitter.split_texts(
+        {job.id: job.job_summary for job in jobs},
+        max_tokens,
+        config.embed_model)
+
+    # job.id -> [(content hash, chunk text), ...]
+    job_chunks = {
+        job_id: [(embedding_cache.get_key(chunk, config.embed_model), chunk) for chunk in chunks]
+        for job_id, chunks in chunks_by_job.items()
+    }
+
+    # content hash -> [(chunk text, vector), ...]; more than one if the server re-split the chunk
+    embedded = {
+        key: [(None, vector)]
+        for key, vector in embedding_cache.lookup(
+            db_session, [key for chunks in job_chunks.values() for key, _ in chunks]).items()
+    }
+
+    missing = {
+        key: chunk
+        for chunks in job_chunks.values()
+        for key, chunk in chunks
+        if key not in embedded
+    }
+
+    # with no chunks, all() would be true and the job marked embedded without a single vector
+    failed = {
+        job.job_id: "summary is empty, nothing to embed"
+        for job in jobs
+        if not job_chunks[job.id]
+    }
+
+    if failed and on_warning:
+        on_warning(f"{len(failed)} jobs have an empty summary and are skipped.")
+
+    # Job.id -> job still waiting for vectors
+    pending_jobs = {job.id: job for job in jobs if job_chunks[job.id]}
+
+    # content hash -> jobs that contain the chunk
+    jobs_by_key = {}
+    for job in pending_jobs.values():
+        for key, _ in job_chunks[job.id]:
+            jobs_by_key.setdefault(key, []).append(job)
+
+    total = len(pending_jobs)
+    completed = 0
+    chunk_errors = {}  # content hash -> error
+
+    with WriteBehindBuffer(db_session) as write_buffer:
+
+        def write_if_ready(job):
+
+            nonlocal completed
+
+            chunks = job_chunks[job.id]
+            if job.id not in pending_jobs or not all(key in embedded for key, _ in chunks):
+                return
+
+            pieces = [
+                (text or chunk, vector)
+                for key, chunk in chunks
+                for text, vector in embedded[key]
+            ]
+
+            job_embeddings = [
+                dict(
                     job_id=job.id,
+                    embed_model=config.embed_model,
+                    chunker_version=text_splitter.chunker_version,
                     chunk_index=idx,
                     chunk_text=text,
-                    embedding=vector))
+                    embedding=vector)
+                for idx, (text, vector) in enumerate(pieces)
+            ]
 
-            job.is_embedded = True
+            # all vectors of the job form one unit, committed together; their presence marks it embedded.
+            # Rows another worker stored first are kept, so a duplicate run cannot fail the commit.
+            write_buffer.execute(
+                insert(JobEmbedding).values(job_embeddings)
+                .on_conflict_do_nothing(constraint="uq_job_embeddings_chunk"))
 
-            db_session.add(job)
-            db_session.commit()
+            del pending_jobs[job.id]
+            completed += 1
 
-        ################
+            if on_progress:
+                on_progress(completed, total)
 
-        st_status.update(label="Embedding done!", state="complete", expanded=False)
+        for job in list(pending_jobs.values()):
+            write_if_ready(job)
 
-    return True, None
+        # chunks already fit the model; a chunk_size no smaller than any of them keeps the server from re-splitting
+        results = rag_search_remote.iter_embeddings(
+            missing,
+            config.embed_model,
+            chunk_size=max((len(chunk) for chunk in missing.values()), default=None),
+            max_workers=max_workers)
 
+        for key, status, output in results:
 
-def get_max_characters_embedding(embed_model):
+            if status:
 
-    status, output = rag_search_remote.get_max_tokens(embed_model)
-    if not status:
-        return False, f"cannot get embedding model max tokens: {output}"
+                vectors = output.get("vectors", [])
+                chunk_text = output.get("chunk_text", [])
+
+                if not vectors or len(vectors) != len(chunk_text):
+                    status, output = False, f"mismatch between number of vectors and chunk texts for chunk '{missing[key][:40]}...'"
+
+            if not status:
+
+                # only the jobs containing this chunk fail
+                chunk_errors[key] = output
+
+                for job in jobs_by_key[key]:
+                    if pending_jobs.pop(job.id, None):
+                        failed[job.job_id] = f"Embedding error: {output}"
+
+                continue
+
+            if len(vectors) == 1:
+                embedding_cache.store(db_session, key, config.embed_model, vectors[0])
+                embedded[key] = [(None, vectors[0])]
+            else:
+                embedded[key] = list(zip(chunk_text, vectors))
+
+            for job in jobs_by_key[key]:
+                write_if_ready(job)
+
+            write_buffer.flush_if_due()
 
-    max_tokens = output
+    if chunk_errors:
 
-    avg_chars_per_token = 3.5  # in English
-    approx_max_characters = max_tokens * avg_chars_per_token
+        # the model may have been unloaded on the server; have the next run check it again
+        model_registry.invalidate([config.embed_model])
 
-    return True, approx_max_characters
+        if on_warning:
+            on_warning(f"{len(chunk_errors)} chunks could not be embedded, "
+                       f"{total - completed} jobs are skipped: " + "; ".join(set(chunk_errors.values())))
 
+    return True, failed
 
-def store_embedding(db_session, batch_id, collection_name, job_ids_to_process):
+
+def store_embedding(db_session, collection_name, jobs_to_index):
 
     with st.status("Storing Embeddings...", expanded=True) as st_status:
 
-        st.write(f"Loading embedding model: {config.embed_model}...")
+        if not model_registry.is_loaded(config.embed_model):
+            st.write(f"Loading embedding model: {config.embed_model}...")
 
-        status, output = rag_search_remote.load_model([config.embed_model])
+        status, output = model_registry.ensure_loaded([config.embed_model])
         if not status:
             return False, f"Cannot load model: {output}"
 
-        st.write(f"Creating collection {collection_name}...")
+        embedded_ids = embedding_versions.embedded_job_ids(db_session, [job.id for job in jobs_to_index])
 
-        status, output = rag_search_remote.create_collection(
-            collection_name,
-            config.embed_model)
+        if len(embedded_ids) != len(jobs_to_index):
+            return False, "Not all visible jobs were embedded!"
 
+        job_ids = [job.job_id for job in jobs_to_index]
+
+        # upsert: drop any points a previous, interrupted upload left behind for these jobs
+        status, output = rag_search_remote.remove_jobs_from_collection(collection_name, job_ids)
         if not status:
-            return False, f"create_collection error: {output}"
+            return False, f"Cannot remove stale points: {output}"
 
-        jobs_embedded = (
-            db_session.query(Job)
-            .filter(Job.job_id.in_(job_ids_to_process), Job.is_summarized==True, Job.is_embedded==True)
-            .all()
-        )
+        vectors = []
+        chunk_texts = []
+        metadata = []
 
-        if len(jobs_embedded) != len(job_ids_to_process):
-            return False, "Not all visible jobs were embedded!"
+        for job in jobs_to_index:
 
-        for job in jobs_embedded:
-
-            metadata = {
+            job_metadata = {
                 "source"   : "Job Genius",
-                "batch_id" : batch_id,
                 "job_id"   : job.job_id,
                 "title"    : job.title,
                 "company"  : job.company.name,
             }
 
-            vectors = [e.embedding for e in job.embeddings]
-            chunk_texts = [e.chunk_text for e in job.embeddings]
+            for e in embedding_versions.get_embeddings(db_session, job.id):
+                vectors.append(e.embedding)
+                chunk_texts.append(e.chunk_text)
+                metadata.append(job_metadata)
 
-            status, output = rag_search_remote.add_points(
-                config.embed_model,
-                collection_name,
-                vectors,
-                texts=chunk_texts,
-                metadata=metadata)
+        st.write(f"Uploading {len(vectors)} points of {len(jobs_to_index)} jobs to {collection_name}...")
 
-            if not status:
-                return False, output
+        status, output = rag_search_remote.add_points_bulk(
+            config.embed_model,
+            collection_name,
+            vectors,
+            chunk_texts,
+            metadata)
+
+        if not status:
+            return False, output
+
+        for job in jobs_to_index:
+            db_session.add(CollectionJob(job_id=job.id, collection_name=collection_name))
+
+        db_session.commit()
+
+        collection_manager.touch(
+            db_session,
+            collection_name,
+            embed_model=config.embed_model,
+            added_points=len(vectors),
+            vector_dim=len(vectors[0]) if vectors else None)
 
         ################
 
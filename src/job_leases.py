@@ -0,0 +1,167 @@
+import os
+import time
+import uuid
+import socket
+import logging
+import threading
+
+import redis
+
+import config
+from models_redis import lease_redis_client
+
+log = logging.getLogger(__name__)
+
+# delete / extend a lease only if it is still ours (it may have expired and been taken over)
+release_script = lease_redis_client.register_script("""
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+""")
+
+renew_script = lease_redis_client.register_script("""
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+""")
+
+
+class JobLeases:
+    """
+    Per-job leases in Redis, so a job is enriched by one worker at a time across browser
+    sessions, the background daemon and processes.
+
+    A lease is a key lease:<stage>:<Job.id> set with SET NX EX; it expires on its own if the
+    holder crashes. While leases are held, a heartbeat thread renews them every third of
+    their lifetime, so long LLM calls or map-reduce summaries do not outlive them; they are
+    released on exit.
+    If Redis is unreachable, leases are granted locally so enrichment still works, just
+    without the cross-worker guarantee.
+    """
+
+    def __init__(self, stage, ttl=None, wait_seconds=None):
+        """
+        :param stage: "summarize" or "embed"
+        :param ttl: lease lifetime in seconds, renewed while held
+        :param wait_seconds: how long acquire() waits for jobs leased by another worker
+        """
+
+        self.stage = stage
+        self.ttl = ttl or config.job_lease_seconds
+        self.wait_seconds = config.job_lease_wait_seconds if wait_seconds is None else wait_seconds
+
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.held = set()
+        self.held_lock = threading.Lock()
+
+        self.heartbeat = None
+        self.stopped = threading.Event()
+
+
+    def __enter__(self):
+
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        self.release()
+        return False
+
+
+    def get_key(self, job_id):
+
+        return f"lease:{self.stage}:{job_id}"
+
+
+    def acquire(self, job_ids):
+        """
+        Lease the given Job.id values, waiting up to wait_seconds for those held elsewhere.
+        Returns (acquired, busy) lists of job ids.
+        """
+
+        pending = list(job_ids)
+        deadline = time.monotonic() + self.wait_seconds
+
+        while True:
+
+            pending = [job_id for job_id in pending if not self.try_acquire(job_id)]
+
+            if not pending or time.monotonic() >= deadline:
+                break
+
+            time.sleep(config.job_lease_poll_seconds)
+
+        self.start_heartbeat()
+
+        busy = set(pending)
+
+        return [job_id for job_id in job_ids if job_id not in busy], pending
+
+
+    def try_acquire(self, job_id):
+
+        try:
+            acquired = lease_redis_client.set(self.get_key(job_id), self.owner, nx=True, ex=self.ttl)
+        except redis.RedisError as e:
+            log.warning(f"[JobLeases] Redis error, leasing job {job_id} locally: {e}")
+            acquired = True
+
+        if acquired:
+            with self.held_lock:
+                self.held.add(job_id)
+
+        return bool(acquired)
+
+
+    def start_heartbeat(self):
+
+        if not self.held or (self.heartbeat and self.heartbeat.is_alive()):
+            return
+
+        self.stopped.clear()
+        self.heartbeat = threading.Thread(target=self.heartbeat_loop, name=f"lease-{self.stage}", daemon=True)
+        self.heartbeat.start()
+
+
+    def heartbeat_loop(self):
+
+        while not self.stopped.wait(self.ttl / 3):
+            self.renew()
+
+
+    def renew(self):
+        """
+        Extend the held leases to a full ttl.
+        """
+
+        with self.held_lock:
+            held = list(self.held)
+
+        try:
+            for job_id in held:
+                if not renew_script(keys=[self.get_key(job_id)], args=[self.owner, self.ttl]):
+                    log.warning(f"[JobLeases] lease on {self.stage} of job {job_id} was lost")
+        except redis.RedisError as e:
+            log.warning(f"[JobLeases] Redis error renewing {len(held)} leases: {e}")
+
+
+    def release(self):
+
+        self.stopped.set()
+
+        if self.heartbeat:
+            self.heartbeat.join()
+            self.heartbeat = None
+
+        with self.held_lock:
+            held = list(self.held)
+            self.held.clear()
+
+        try:
+            for job_id in held:
+                release_script(keys=[self.get_key(job_id)], args=[self.owner])
+        except redis.RedisError as e:
+            log.warning(f"[JobLeases] Redis error releasing {len(held)} leases, they expire in {self.ttl}s: {e}")
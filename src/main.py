@@ -8,6 +8,7 @@ from sidebar_processor import update_sidebar, get_current_filters
 from search_jobs import start_job_search
 from display_jobs import process_results, show_jobs
 from personalized import resume_cover_letter_builder
+from chat_llm import send_prompt_to_llm
 
 from models_sql import init_db, Session, Job, Profile
 from db_profiles import get_all_profiles, load_profile, save_profile, set_active_profile
@@ -63,13 +64,27 @@ if st.session_state.get("generate_resume"):
     st.divider()
 
 
-if st.session_state.get("llm_response"):
+if st.session_state.get("llm_request"):
+
+    # kept until Back is pressed; the answer is streamed once and re-rendered from state on reruns
+    llm_request = st.session_state["llm_request"]
 
     st.markdown("### 🤖 Assistant Response")
-    st.markdown(st.session_state["llm_response"])
+
+    if "answer" in llm_request:
+        if llm_request["answer"]:
+            st.markdown(llm_request["answer"])
+        else:
+            st.warning(llm_request["error"])
+    else:
+        status, output = send_prompt_to_llm(llm_request["user_prompt"], llm_request["job_ids"])
+        if not status:
+            st.warning(output)
+        llm_request["answer"] = output if status else None
+        llm_request["error"] = None if status else output
 
     if st.button("⬅️ Back to Search", key="back_from_llm_response"):
-        st.session_state["llm_response"] = None
+        st.session_state.pop("llm_request", None)
         st.rerun()
 
     st.divider()
@@ -115,7 +130,7 @@ if st.session_state.get("show_favorites_pane"):
 # Search for jobs
 if st.button("🚀 Search Jobs"):
     with st.spinner("Searching..."):
-        st.session_state["llm_response"] = None
+        st.session_state.pop("llm_request", None)
         start_job_search()
 
 # Displaying jobs
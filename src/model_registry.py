@@ -0,0 +1,207 @@
+
+import time
+import logging
+import threading
+
+import config
+import rag_search_remote
+
+# Client-side view of what RAG-Search has loaded, so hot paths can skip load_model
+# and the LLM model list round trips. Entries expire after config.model_registry_ttl
+# and are dropped as soon as a call that depends on them fails.
+
+loaded_models = {}  # model name -> time.monotonic() when load_model last succeeded
+
+llm_models_cache = {
+    "models": None,
+    "fetched_at": 0.0
+}
+
+registry_lock = threading.Lock()
+
+log = logging.getLogger(__name__)
+
+# load/unload churn, used to size the inference host
+metrics = {
+    "hits": 0,             # ensure_loaded served from the registry
+    "loads": 0,            # models loaded through load_model
+    "load_failures": 0,
+    "unloads": 0,          # models evicted to stay within the residency budget
+    "unload_failures": 0
+}
+
+
+def is_loaded(model_name):
+
+    with registry_lock:
+        loaded_at = loaded_models.get(model_name)
+
+    if loaded_at is None:
+        return False
+
+    return time.monotonic() - loaded_at < config.model_registry_ttl
+
+
+def ensure_loaded(model_list):
+
+    missing = [model for model in model_list if not is_loaded(model)]
+
+    with registry_lock:
+        metrics["hits"] += len(model_list) - len(missing)
+
+    if not missing:
+        return True, None
+
+    status, output = rag_search_remote.load_model(missing)
+    if not status:
+        invalidate(missing)
+        with registry_lock:
+            metrics["load_failures"] += len(missing)
+        return False, output
+
+    now = time.monotonic()
+
+    with registry_lock:
+        for model in missing:
+            loaded_models[model] = now
+        metrics["loads"] += len(missing)
+
+    enforce_budget(protected=model_list)
+
+    return True, output
+
+
+def invalidate(model_list=None):
+    """
+    Forget the given models (or everything when model_list is None).
+    """
+
+    with registry_lock:
+
+        if model_list is None:
+            loaded_models.clear()
+            llm_models_cache["models"] = None
+            return
+
+        for model in model_list:
+            loaded_models.pop(model, None)
+
+
+def get_model_memory(model_name):
+
+    return config.model_memory_gb.get(model_name, config.default_model_memory_gb)
+
+
+def get_resident_models():
+    """
+    Models assumed to occupy memory on the inference host, least recently used first.
+    Hosted models (memory estimate 0) are never counted.
+    """
+
+    with registry_lock:
+        last_use = dict(loaded_models)
+
+    for model_name, used_at in list(rag_search_remote.model_last_used.items()):
+        last_use[model_name] = max(used_at, last_use.get(model_name, 0.0))
+
+    resident = [model for model in last_use if get_model_memory(model) > 0]
+
+    return sorted(resident, key=lambda model: last_use[model])
+
+
+def enforce_budget(protected=()):
+    """
+    Unload least-recently-used models until the resident set fits
+    config.max_resident_models and config.max_resident_memory_gb.
+    Models in protected are about to be used and are never unloaded.
+    """
+
+    resident = get_resident_models()
+
+    def over_budget():
+        if len(resident) > config.max_resident_models:
+            return True
+        return sum(get_model_memory(model) for model in resident) > config.max_resident_memory_gb
+
+    while over_budget():
+
+        victim = next((model for model in resident if model not in protected), None)
+        if victim is None:
+            break
+
+        unload(victim)
+        resident.remove(victim)
+
+
+def unload(model_name):
+
+    status, output = rag_search_remote.unload_model(model_name)
+
+    with registry_lock:
+
+        loaded_models.pop(model_name, None)
+
+        if status:
+            metrics["unloads"] += 1
+        else:
+            metrics["unload_failures"] += 1
+
+    if status:
+        log.info(f"[ModelRegistry] unloaded {model_name}")
+    else:
+        log.warning(f"[ModelRegistry] cannot unload {model_name}: {output}")
+
+    return status, output
+
+
+def get_metrics():
+
+    with registry_lock:
+        snapshot = dict(metrics)
+
+    resident = get_resident_models()
+
+    snapshot["resident_models"] = resident
+    snapshot["resident_memory_gb"] = round(sum(get_model_memory(model) for model in resident), 1)
+
+    return snapshot
+
+
+def get_llm_models(refresh=False):
+
+    with registry_lock:
+        models = llm_models_cache["models"]
+        age = time.monotonic() - llm_models_cache["fetched_at"]
+
+    if models is not None and not refresh and age < config.model_registry_ttl:
+        return True, models
+
+    status, output = rag_search_remote.get_llm_models()
+    if not status:
+        with registry_lock:
+            llm_models_cache["models"] = None
+        return False, output
+
+    with registry_lock:
+        llm_models_cache["models"] = output
+        llm_models_cache["fetched_at"] = time.monotonic()
+
+    return True, output
+
+
+def has_llm_model(model_name):
+
+    status, output = get_llm_models()
+    if not status:
+        return False, output
+
+    if model_name in output:
+        enforce_budget(protected=[model_name])
+        return True, True
+
+    # the cached list may predate the model being pulled on the server
+    status, output = get_llm_models(refresh=True)
+    if not status:
+        return False, output
+
+    return True, model_name in output
@@ -9,6 +9,9 @@ logging.basicConfig(level=logging.INFO)
 
 redis_client = redis.Redis(host='redis_job', port=6379, db=0)
 
+# enrichment leases (see job_leases) live in their own db, so "Clear Job Cache" (flushdb) cannot drop them
+lease_redis_client = redis.Redis(host='redis_job', port=6379, db=1)
+
 
 def sanitize_key(key_str):
 
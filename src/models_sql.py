@@ -1,9 +1,10 @@
 
+import threading
 from datetime import datetime, timezone
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, BigInteger, Float, JSON
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, UniqueConstraint
 from sqlalchemy import LargeBinary
 from sqlalchemy.ext.mutable import MutableList
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
@@ -54,9 +55,16 @@ class Job(Base):
     job_google_link = Column(String)
 
     is_summarized = Column(Boolean, default=False)
-    is_embedded = Column(Boolean, default=False)
 
     job_summary = Column(Text)
+    preview_summary = Column(Text)  # extractive, computed at ingest
+
+    # structured facts extracted with the summary
+    seniority = Column(String, index=True)
+    remote_policy = Column(String, index=True)
+    min_years_experience = Column(Integer, index=True)
+
+    skills = relationship("JobSkill", back_populates="job", cascade="all, delete-orphan")
 
     company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
     company = relationship("Company", back_populates="jobs")
@@ -86,10 +94,18 @@ class Company(Base):
 class JobEmbedding(Base):
 
     __tablename__ = "job_embeddings"
+    # one row per chunk, so concurrent enrichment of the same job cannot store it twice
+    __table_args__ = (
+        UniqueConstraint("job_id", "embed_model", "chunker_version", "chunk_index", name="uq_job_embeddings_chunk"),
+    )
 
     id = Column(Integer, primary_key=True)
     job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False)
 
+    # what produced the vector; a job is embedded per (embed_model, chunker_version)
+    embed_model = Column(String)
+    chunker_version = Column(Integer)
+
     chunk_index = Column(Integer, nullable=False)
     chunk_text = Column(Text, nullable=False)
     embedding = Column(ARRAY(Float), nullable=False)
@@ -97,7 +113,145 @@ class JobEmbedding(Base):
     job = relationship("Job", back_populates="embeddings")
 
     def __repr__(self):
-        return f"<JobEmbedding job_id={self.job_id} chunk_index={self.chunk_index}>"
+        return f"<JobEmbedding job_id={self.job_id} embed_model={self.embed_model} v{self.chunker_version} chunk_index={self.chunk_index}>"
+
+
+class JobSkill(Base):
+
+    __tablename__ = "job_skills"
+    __table_args__ = (UniqueConstraint("job_id", "skill"),)
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    skill = Column(String, nullable=False, index=True)  # lower-case
+
+    job = relationship("Job", back_populates="skills")
+
+    def __repr__(self):
+        return f"<JobSkill job_id={self.job_id} skill={self.skill}>"
+
+
+class CollectionJob(Base):
+    """
+    Jobs whose embeddings are already uploaded to a vector collection on RAG-Search.
+    """
+
+    __tablename__ = "collection_jobs"
+    __table_args__ = (UniqueConstraint("job_id", "collection_name"),)
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    collection_name = Column(String, nullable=False, index=True)
+    added_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<CollectionJob job_id={self.job_id} collection={self.collection_name}>"
+
+
+class VectorCollection(Base):
+    """
+    Usage record of a vector collection on RAG-Search, used to evict idle collections.
+    """
+
+    __tablename__ = "vector_collections"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)
+    embed_model = Column(String)
+
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    last_used_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
+
+    num_points = Column(Integer, default=0)
+    vector_dim = Column(Integer)
+
+    def __repr__(self):
+        return f"<VectorCollection name={self.name} points={self.num_points}>"
+
+
+class EmbeddingCache(Base):
+    """
+    Chunk embeddings keyed by a hash of the normalized chunk text and embedding model,
+    so boilerplate shared by many postings is embedded once.
+    """
+
+    __tablename__ = "embedding_cache"
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False, unique=True, index=True)
+
+    embed_model = Column(String, nullable=False)
+    embedding = Column(ARRAY(Float), nullable=False)
+
+    added_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<EmbeddingCache embed_model={self.embed_model} content_hash={self.content_hash[:8]}>"
+
+
+class SummaryCache(Base):
+    """
+    LLM job summaries keyed by a hash of the normalized job text, model and prompt version,
+    so identical postings are summarized once regardless of their job_id.
+    """
+
+    __tablename__ = "summary_cache"
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False, unique=True, index=True)
+
+    llm_model = Column(String, nullable=False)
+    prompt_version = Column(Integer, nullable=False)
+    summary = Column(Text, nullable=False)
+
+    added_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<SummaryCache hash={self.content_hash[:12]} model={self.llm_model}>"
+
+
+class EnrichmentRun(Base):
+    """
+    One summarize-and-embed pass over a set of jobs; resumed when the same set is enriched again.
+    """
+
+    __tablename__ = "enrichment_runs"
+
+    id = Column(Integer, primary_key=True)
+    run_key = Column(String, nullable=False, unique=True, index=True)  # hash of the job ids
+
+    status = Column(String, nullable=False, default="running")  # running / done / failed
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    items = relationship("EnrichmentRunItem", back_populates="run", cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<EnrichmentRun id={self.id} status={self.status}>"
+
+
+class EnrichmentRunItem(Base):
+
+    __tablename__ = "enrichment_run_items"
+    __table_args__ = (UniqueConstraint("run_id", "job_id", "stage"),)
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("enrichment_runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False)
+
+    stage = Column(String, nullable=False)                      # summarize / embed
+    state = Column(String, nullable=False, default="pending")   # pending / running / done / failed
+
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    next_attempt_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    run = relationship("EnrichmentRun", back_populates="items")
+    job = relationship("Job")
+
+    def __repr__(self):
+        return f"<EnrichmentRunItem job_id={self.job_id} stage={self.stage} state={self.state}>"
 
 
 class Profile(Base):
@@ -127,6 +281,87 @@ class Profile(Base):
         return f"<Profile name={self.name} location={self.my_location}>"
 
 
-def init_db():
+db_initialized = False
+db_init_lock = threading.Lock()
 
-    Base.metadata.create_all(engine)
+
+def init_db():
+    """
+    Create and migrate the schema, once per process: main.py calls this on every Streamlit rerun.
+    """
+
+    global db_initialized
+
+    with db_init_lock:
+
+        if db_initialized:
+            return
+
+        Base.metadata.create_all(engine)
+        migrate_db()
+
+        db_initialized = True
+
+
+# create_all() does not alter existing tables; columns and indexes added later are listed here.
+# Each one is only issued when the catalog says it is missing: ALTER TABLE and CREATE INDEX lock
+# the table even when IF NOT EXISTS turns them into no-ops, and enrichment holds it for minutes.
+
+# (table, column, type)
+column_migrations = [
+    ("jobs", "seniority", "VARCHAR"),
+    ("jobs", "remote_policy", "VARCHAR"),
+    ("jobs", "min_years_experience", "INTEGER"),
+    ("jobs", "preview_summary", "TEXT"),
+    ("job_embeddings", "embed_model", "VARCHAR"),
+    ("job_embeddings", "chunker_version", "INTEGER"),
+]
+
+# (index or constraint name, statements creating it)
+index_migrations = [
+    # drop duplicate chunks stored by concurrent runs before the unique constraint existed, then add it
+    ("uq_job_embeddings_chunk", [
+        """
+        DELETE FROM job_embeddings a USING job_embeddings b
+            WHERE a.id > b.id
+            AND a.job_id = b.job_id
+            AND a.chunk_index = b.chunk_index
+            AND a.embed_model IS NOT DISTINCT FROM b.embed_model
+            AND a.chunker_version IS NOT DISTINCT FROM b.chunker_version
+        """,
+        "ALTER TABLE job_embeddings ADD CONSTRAINT uq_job_embeddings_chunk "
+        "UNIQUE (job_id, embed_model, chunker_version, chunk_index)",
+    ]),
+    ("ix_jobs_seniority", ["CREATE INDEX ix_jobs_seniority ON jobs (seniority)"]),
+    ("ix_jobs_remote_policy", ["CREATE INDEX ix_jobs_remote_policy ON jobs (remote_policy)"]),
+    ("ix_jobs_min_years_experience", ["CREATE INDEX ix_jobs_min_years_experience ON jobs (min_years_experience)"]),
+]
+
+obsolete_indexes = [
+    "ix_job_embeddings_version",  # covered by the unique constraint
+]
+
+
+def migrate_db():
+
+    with engine.begin() as conn:
+
+        existing_columns = set(conn.execute(text(
+            "SELECT table_name, column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema()")).all())
+
+        def exists(relation):
+            return conn.execute(text("SELECT to_regclass(:name)"), {"name": relation}).scalar() is not None
+
+        for table, column, column_type in column_migrations:
+            if (table, column) not in existing_columns:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+
+        for name, statements in index_migrations:
+            if not exists(name):
+                for statement in statements:
+                    conn.execute(text(statement))
+
+        for name in obsolete_indexes:
+            if exists(name):
+                conn.execute(text(f"DROP INDEX {name}"))
@@ -0,0 +1,93 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from models_sql import Session, Job
+from job_embedder import prepare_summarization, summarize_job_batch
+
+log = logging.getLogger(__name__)
+
+# Summarizes a single job when the user asks for it from its card, instead of waiting
+# for a bulk enrichment run. Requests are process-wide: a job that is already being
+# summarized (for this or another browser session) shares the in-flight future, and
+# the result is stored in the DB like any other summary.
+
+executor = ThreadPoolExecutor(max_workers=config.on_demand_workers, thread_name_prefix="on-demand-summary")
+
+# Job.id -> Future of (status, job_summary or error)
+in_flight = {}
+in_flight_lock = threading.Lock()
+
+
+def request_summary(job_id):
+    """
+    Returns a Future of (status, job_summary) for the job with primary key job_id,
+    starting a summarization unless one is already running.
+    """
+
+    with in_flight_lock:
+
+        future = in_flight.get(job_id)
+        if future:
+            return future
+
+        future = executor.submit(summarize_job, job_id)
+        in_flight[job_id] = future
+
+    future.add_done_callback(lambda _: release(job_id))
+
+    return future
+
+
+def is_in_flight(job_id):
+
+    with in_flight_lock:
+        return job_id in in_flight
+
+
+def release(job_id):
+
+    with in_flight_lock:
+        in_flight.pop(job_id, None)
+
+
+def summarize_job(job_id):
+
+    with Session() as db_session:
+
+        job = db_session.get(Job, job_id)
+        if not job:
+            return False, f"job {job_id} not found"
+
+        if job.is_summarized and job.job_summary:
+            return True, job.job_summary
+
+        status, output = prepare_summarization()
+        if not status:
+            return False, output
+
+        context_length_tokens = output
+
+        failed = summarize_job_batch(
+            db_session,
+            [job],
+            context_length_tokens,
+            max_workers=1,
+            on_warning=lambda message: log.warning(f"[OnDemandSummary] {message}"))
+
+        if failed:
+            return False, failed[job.job_id]
+
+        return True, job.job_summary
+
+
+def get_summary(job_id):
+    """
+    Summarize one job, or wait for the summarization already in flight. Returns (status, job_summary).
+    """
+
+    try:
+        return request_summary(job_id).result()
+    except Exception as e:
+        return False, str(e)
@@ -3,9 +3,8 @@ import streamlit as st
 
 import config
 import rag_search_remote
-from models_sql import Session
+import on_demand_summary
 from chat_llm import get_resume_text
-from job_embedder import summarize_jobs
 
 
 prompt_resume = """
@@ -68,17 +67,17 @@ def resume_cover_letter_builder(job):
 
     ########
 
-    if not job.job_summary:
+    job_summary = job.job_summary
 
-        with Session() as db_session:
+    if not job_summary:
 
-            status, output = summarize_jobs(db_session, [job])
-            if not status:
-                return False, output
+        with st.spinner("Summarizing job..."):
+            status, output = on_demand_summary.get_summary(job.id)
 
-            job = db_session.query(Job).get(job.id)
+        if not status:
+            return False, output
 
-    job_summary = job.job_summary
+        job_summary = output
 
     ########
 
@@ -89,13 +88,22 @@ def resume_cover_letter_builder(job):
             JOB_DESCRIPTION_HERE=job_summary
         )
 
-        status, resume_output = rag_search_remote.llm_chat(
+        status, resume_output = rag_search_remote.llm_chat_stream(
             question,
             config.llm_model_chat,
             session_id=f"resume_{job.job_id}"
         )
 
-        st_status.update(label="Resume generated!", state="complete", expanded=False)
+        if status:
+            stream = resume_output
+            resume_output = st.write_stream(stream)
+            if stream.error:
+                status, resume_output = False, stream.error
+
+        if status:
+            st_status.update(label="Resume generated!", state="complete", expanded=False)
+        else:
+            st_status.update(label="Resume generation failed", state="error", expanded=True)
 
     if not status:
         return False, f"resume generation failed: {resume_output}"
@@ -109,13 +117,22 @@ def resume_cover_letter_builder(job):
             JOB_DESCRIPTION_HERE=job_summary
         )
 
-        status, cover_output = rag_search_remote.llm_chat(
+        status, cover_output = rag_search_remote.llm_chat_stream(
             question,
             config.llm_model_chat,
             session_id=f"cover_letter_{job.job_id}"
         )
 
-        st_status.update(label="Cover letter generated!", state="complete", expanded=False)
+        if status:
+            stream = cover_output
+            cover_output = st.write_stream(stream)
+            if stream.error:
+                status, cover_output = False, stream.error
+
+        if status:
+            st_status.update(label="Cover letter generated!", state="complete", expanded=False)
+        else:
+            st_status.update(label="Cover letter generation failed", state="error", expanded=True)
 
     if not status:
         return False, f"cover letter generation failed: {cover_output}"
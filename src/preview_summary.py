@@ -0,0 +1,118 @@
+import re
+import math
+
+import config
+
+# Extractive preview of a job, computed at ingest without any LLM call and shown on
+# the job card until the LLM summary is available. Sentences of the description are
+# ranked with TextRank (PageRank over a word-overlap sentence graph), nudged towards
+# sentences about requirements and responsibilities.
+
+stop_words = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in",
+    "is", "it", "its", "of", "on", "or", "our", "that", "the", "their", "this", "to",
+    "we", "will", "with", "you", "your", "who", "all", "can", "us", "about", "into"
+}
+
+keyword_boost = {
+    "experience": 0.3, "years": 0.3, "required": 0.3, "requirements": 0.3,
+    "responsible": 0.2, "responsibilities": 0.2, "skills": 0.2, "degree": 0.2,
+    "build": 0.1, "design": 0.1, "develop": 0.1, "lead": 0.1, "team": 0.1
+}
+
+sentence_pattern = re.compile(r"(?<=[.!?])\s+|\n+")
+word_pattern = re.compile(r"[a-z][a-z0-9+#.]*")
+
+max_sentences_ranked = 80  # keeps the O(n^2) graph in the millisecond range
+
+
+def build_preview(description, job_highlights=None):
+    """
+    Returns a short Markdown preview from the description and highlight sections, or None.
+    """
+
+    parts = []
+
+    sentences = summarize_text(description or "", config.preview_sentences)
+    if sentences:
+        parts.append(" ".join(sentences))
+
+    for section, bullets in (job_highlights or {}).items():
+
+        if not isinstance(bullets, list) or not bullets:
+            continue
+
+        lines = [
+            "- " + re.sub(r"\s+", " ", item).strip()
+            for item in bullets[:config.preview_bullets]
+            if isinstance(item, str) and item.strip()
+        ]
+
+        if lines:
+            parts.append(f"**{section}**\n" + "\n".join(lines))
+
+    return "\n\n".join(parts) or None
+
+
+def summarize_text(text, count):
+    """
+    Returns the count highest ranked sentences of text, in their original order.
+    """
+
+    # dict keeps the first occurrence of sentences repeated in the posting
+    sentences = list(dict.fromkeys(
+        sentence.strip()
+        for sentence in sentence_pattern.split(text)
+        if 30 <= len(sentence.strip()) <= 400
+    ))[:max_sentences_ranked]
+
+    if len(sentences) <= count:
+        return sentences
+
+    scores = rank_sentences(sentences)
+
+    top = sorted(range(len(sentences)), key=lambda idx: scores[idx], reverse=True)[:count]
+
+    return [sentences[idx] for idx in sorted(top)]
+
+
+def rank_sentences(sentences, damping=0.85, iterations=30):
+
+    words = [
+        {word for word in word_pattern.findall(sentence.lower()) if word not in stop_words}
+        for sentence in sentences
+    ]
+
+    n = len(sentences)
+
+    # edge weight: word overlap normalized by sentence lengths (TextRank similarity)
+    weights = [[0.0] * n for _ in range(n)]
+
+    for i in range(n):
+        for j in range(i + 1, n):
+
+            if len(words[i]) < 2 or len(words[j]) < 2:
+                continue
+
+            overlap = len(words[i] & words[j])
+            if overlap:
+                weights[i][j] = weights[j][i] = overlap / (math.log(len(words[i])) + math.log(len(words[j])))
+
+    totals = [sum(row) for row in weights]
+
+    scores = [1.0] * n
+
+    for _ in range(iterations):
+        scores = [
+            (1 - damping) + damping * sum(
+                weights[j][i] / totals[j] * scores[j]
+                for j in range(n) if weights[j][i]
+            )
+            for i in range(n)
+        ]
+
+    # earlier sentences and requirement-like wording get a small boost
+    return [
+        score * (1 + sum(keyword_boost.get(word, 0) for word in words[idx])) * (1 + 0.5 / (idx + 1))
+        for idx, score in enumerate(scores)
+    ]
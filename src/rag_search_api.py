@@ -1,6 +1,9 @@
 
+import json
 import getpass
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 
 from rest_client import REST_API_Client
 
@@ -11,17 +14,25 @@ class RAG_SEARCH_REST_API_Client(REST_API_Client):
                  url,
                  api_ver=None,
                  base=None,
-                 user=getpass.getuser()):
+                 user=getpass.getuser(),
+                 pool_maxsize=10):
 
         super().__init__(url, api_ver, base, user)
 
+        # one pooled session shared by every call of this client
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
 
     def is_healthy(self):
 
         url = f"{self.baseurl}/health"
 
         try:
-            response = requests.get(url, timeout=5)
+            response = self.session.get(url, timeout=5)
             return response.status_code == 200
         except Exception as e:
             print(f"RAG-Search health check failed: {e}")
@@ -61,6 +72,24 @@ class RAG_SEARCH_REST_API_Client(REST_API_Client):
         return self.request("POST", url, json=payload, timeout=timeout)
 
 
+    def llm_chat_stream(self, question, llm_model, context="", session_id="default", timeout=1*60):
+        """
+        Same as llm_chat, but asks the server to stream the answer.
+        Returns the open response; read it with ChatStream.
+        """
+
+        url = f"{self.baseurl}/api/v1/llm/chat"
+
+        payload = {
+            "question": question,
+            "llm_model": llm_model,
+            "context": context,
+            "session_id": session_id,
+            "stream": True
+        }
+
+        return self.request("POST", url, json=payload, timeout=timeout, stream=True)
+
     #######################################
 
     def load_model(self, model_list, timeout=5*60):
@@ -114,6 +143,7 @@ class RAG_SEARCH_REST_API_Client(REST_API_Client):
         session_id="default",
         score_threshold=0.7,
         max_documents=5,
+        filter_dict=None,
         timeout=1*60):
 
         url = f"{self.baseurl}/api/v1/rag/chat"
@@ -129,8 +159,45 @@ class RAG_SEARCH_REST_API_Client(REST_API_Client):
             "max_documents": max_documents
         }
 
+        if filter_dict:
+            payload["filter"] = filter_dict
+
         return self.request("POST", url, json=payload, timeout=timeout)
 
+
+    def rag_chat_stream(
+        self,
+        question,
+        llm_model,
+        embed_model,
+        collection_name,
+        instructions="",
+        session_id="default",
+        score_threshold=0.7,
+        max_documents=5,
+        filter_dict=None,
+        timeout=1*60):
+
+        url = f"{self.baseurl}/api/v1/rag/chat"
+
+        payload = {
+            "question": question,
+            "llm_model": llm_model,
+            "embed_model": embed_model,
+            "collection_name": collection_name,
+            "instructions": instructions,
+            "session_id": session_id,
+            "score_threshold": score_threshold,
+            "max_documents": max_documents,
+            "stream": True
+        }
+
+        if filter_dict:
+            payload["filter"] = filter_dict
+
+        return self.request("POST", url, json=payload, timeout=timeout, stream=True)
+
+
     ##########
 
     def split_document(self, text, chunk_size=1000, separators=None):
@@ -165,6 +232,20 @@ class RAG_SEARCH_REST_API_Client(REST_API_Client):
         return self.request("POST", url, json=json)
 
 
+    def get_collection_info(self, collection_name):
+
+        url = f"{self.baseurl}/api/v1/rag/collection-info/{collection_name}"
+
+        return self.request("GET", url)
+
+
+    def delete_collection(self, collection_name):
+
+        url = f"{self.baseurl}/api/v1/rag/delete-collection/{collection_name}"
+
+        return self.request("DELETE", url)
+
+
     def delete_by_filter(self, collection_name, filter_dict):
 
         url = f"{self.baseurl}/api/v1/rag/del-by-filter"
@@ -195,10 +276,42 @@ class RAG_SEARCH_REST_API_Client(REST_API_Client):
         return self.request("POST", url, json=payload, timeout=timeout)
 
 
+    def iter_embeddings(self, text_blocks, embed_model, separators=None, chunk_size=None, max_workers=4, timeout=10):
+        """
+        Embed several text blocks over the pooled session.
+        text_blocks maps a caller-defined key to its text. The embed endpoint takes one text
+        per call, so all blocks go to one pool with at most max_workers requests in flight.
+        Yields (key, status, output of get_embedding) as the requests complete.
+        """
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            futures = {
+                executor.submit(self.get_embedding, text_block, embed_model, separators, chunk_size, timeout): key
+                for key, text_block in text_blocks.items()
+            }
+
+            for future in as_completed(futures):
+
+                try:
+                    status, output = future.result()
+                except Exception as e:
+                    status, output = False, str(e)
+
+                yield futures[future], status, output
+
+
     def add_points(self, embed_model, collection_name, vectors, texts=None, metadata={}, timeout=10):
+        """
+        metadata is either one dict applied to every point, or a list of dicts aligned with vectors
+        so a single request can carry points that belong to different jobs.
+        """
 
         url = f"{self.baseurl}/api/v1/rag/add_points"
 
+        if isinstance(metadata, list) and len(metadata) != len(vectors):
+            return False, f"Got {len(metadata)} metadata entries for {len(vectors)} vectors"
+
         payload = {
             "embed_model": embed_model,
             "collection_name": collection_name,
@@ -208,3 +321,99 @@ class RAG_SEARCH_REST_API_Client(REST_API_Client):
         }
 
         return self.request("POST", url, json=payload, timeout=timeout)
+
+
+class ChatStream:
+    """
+    Iterable over the answer text of a streamed chat response, for st.write_stream.
+    Handles server-sent events ("data: ..." lines), plain chunked text, and servers
+    that ignore the stream flag and reply with the usual JSON body.
+
+    Errors while reading end the iteration instead of raising; afterwards, error holds
+    the failure (or None) and text the answer received so far.
+    """
+
+    def __init__(self, response):
+
+        self.response = response
+        self.text = ""
+        self.error = None
+
+
+    def __iter__(self):
+
+        try:
+            for piece in self.iter_pieces():
+                if piece:
+                    self.text += piece
+                    yield piece
+        except (requests.RequestException, ValueError) as e:
+            self.error = f"Streaming the answer failed: {e}"
+        finally:
+            self.response.close()
+
+        if not self.error and not self.text.strip():
+            self.error = "Did not get an answer from LLM"
+
+
+    def iter_pieces(self):
+
+        response = self.response
+        content_type = response.headers.get("Content-Type", "")
+
+        if content_type.startswith("application/json"):
+            yield response.json().get("answer", "")
+            return
+
+        if content_type.startswith("text/event-stream"):
+
+            # per the SSE spec: an event's data lines are joined with newlines, only the one
+            # space after "data:" is removed (tokens keep their leading spaces), and a blank
+            # line ends the event; other fields and comments are ignored
+            data_lines = []
+
+            for line in response.iter_lines(decode_unicode=True):
+
+                if line:
+                    if line.startswith("data:"):
+                        value = line[len("data:"):]
+                        data_lines.append(value[1:] if value.startswith(" ") else value)
+                    continue
+
+                if not data_lines:
+                    continue
+
+                data = "\n".join(data_lines)
+                data_lines = []
+
+                if data.strip() == "[DONE]":
+                    return
+
+                yield self.parse_event(data)
+
+            # stream closed without the blank line after the last event
+            if data_lines and "\n".join(data_lines).strip() != "[DONE]":
+                yield self.parse_event("\n".join(data_lines))
+
+            return
+
+        for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+            yield chunk
+
+
+    @staticmethod
+    def parse_event(data):
+        """
+        The answer text of one event: a JSON object with the token, or the raw text itself.
+        """
+
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return data
+
+        if isinstance(event, dict):
+            return event.get("token") or event.get("content") or event.get("answer") or ""
+
+        # a bare number or word that happens to be valid JSON is still text
+        return data
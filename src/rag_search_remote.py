@@ -1,18 +1,34 @@
 
+import time
+
 import config
-from rag_search_api import RAG_SEARCH_REST_API_Client
+from rag_search_api import RAG_SEARCH_REST_API_Client, ChatStream
+from health_monitor import HealthMonitor
+
+rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
+
+health_monitor = HealthMonitor(rest_obj.is_healthy, ttl=config.rag_health_ttl)
+
+
+# model name -> time.monotonic() of the last request that used it (read by model_registry)
+model_last_used = {}
+
+
+def record_model_use(*model_names):
+
+    now = time.monotonic()
+
+    for model_name in model_names:
+        model_last_used[model_name] = now
 
 
 def is_healthy():
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
-    return rest_obj.is_healthy()
+    return health_monitor.is_healthy()
 
 
 def get_llm_models():
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
-
     status, output = rest_obj.get_llm_models()
     if not status:
         return False, output
@@ -32,8 +48,6 @@ def get_llm_info(model_name):
     if model_name in llm_info_map:
         return True, llm_info_map[model_name]
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
-
     status, output = rest_obj.get_llm_info(model_name)
     if not status:
         return False, output
@@ -46,7 +60,7 @@ def get_llm_info(model_name):
 
 def llm_chat(question, llm_model, context="", session_id="default", timeout=5*60):
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
+    record_model_use(llm_model)
 
     status, output = rest_obj.llm_chat(question, llm_model, context, session_id, timeout)
     if not status:
@@ -60,6 +74,20 @@ def llm_chat(question, llm_model, context="", session_id="default", timeout=5*60
     return True, answer
 
 
+def llm_chat_stream(question, llm_model, context="", session_id="default", timeout=5*60):
+    """
+    Returns (True, ChatStream) to render with st.write_stream; check its error afterwards.
+    """
+
+    record_model_use(llm_model)
+
+    status, output = rest_obj.llm_chat_stream(question, llm_model, context, session_id, timeout)
+    if not status:
+        return False, output
+
+    return True, ChatStream(output)
+
+
 def rag_chat(
     question,
     llm_model,
@@ -69,9 +97,10 @@ def rag_chat(
     session_id="default",
     score_threshold=0.7,
     max_documents=5,
+    filter_dict=None,
     timeout=5*60):
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
+    record_model_use(llm_model, embed_model)
 
     status, output = rest_obj.rag_chat(
         question,
@@ -82,6 +111,7 @@ def rag_chat(
         session_id,
         score_threshold,
         max_documents,
+        filter_dict,
         timeout)
 
     if not status:
@@ -94,25 +124,56 @@ def rag_chat(
 
     return True, answer
 
+def rag_chat_stream(
+    question,
+    llm_model,
+    embed_model,
+    collection_name,
+    instructions="",
+    session_id="default",
+    score_threshold=0.7,
+    max_documents=5,
+    filter_dict=None,
+    timeout=5*60):
+
+    record_model_use(llm_model, embed_model)
+
+    status, output = rest_obj.rag_chat_stream(
+        question,
+        llm_model,
+        embed_model,
+        collection_name,
+        instructions,
+        session_id,
+        score_threshold,
+        max_documents,
+        filter_dict,
+        timeout)
+
+    if not status:
+        return False, output
+
+    return True, ChatStream(output)
+
 #################
 
 def load_model(model_list):
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
+    record_model_use(*model_list)
 
     return rest_obj.load_model(model_list)
 
 
 def unload_model(model_name):
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
+    model_last_used.pop(model_name, None)
 
     return rest_obj.unload_model(model_name)
 
 
 def unload_all_models():
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
+    model_last_used.clear()
 
     return rest_obj.unload_all_models()
 
@@ -127,8 +188,6 @@ def get_max_tokens(embed_model):
     if embed_model in tokens_dict_cache:
         return True, tokens_dict_cache[embed_model]
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
-
     status, output = rest_obj.get_max_tokens(embed_model)
     if not status:
         return False, output
@@ -141,43 +200,99 @@ def get_max_tokens(embed_model):
 
 def split_document(text, chunk_size=1000, separators=None):
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
-
     return rest_obj.split_document(text, chunk_size, separators)
 
 #################
 
 def get_collections():
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
-
     return rest_obj.get_collections()
 
 
 def create_collection(collection_name, embed_model):
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
-
     return rest_obj.create_collection(collection_name, embed_model)
 
+
+def get_collection_size(collection_name):
+    """
+    Returns (True, (points, vector dimension)) as reported by the server; either may be None if not reported.
+    """
+
+    status, output = rest_obj.get_collection_info(collection_name)
+    if not status:
+        return False, output
+
+    # Qdrant collection info: points_count and config.params.vectors.size
+    points = output.get("points_count", output.get("vectors_count"))
+
+    vectors = output.get("config", {}).get("params", {}).get("vectors", {})
+    dim = vectors.get("size") if isinstance(vectors, dict) else None
+
+    return True, (points, dim)
+
+
+def delete_collection(collection_name):
+
+    return rest_obj.delete_collection(collection_name)
+
 #################
 
 def remove_embed_email_thread(collection_name, thread_id):
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
-
     return rest_obj.delete_by_filter(collection_name, {"metadata.thread_id": thread_id})
 
 
+def remove_jobs_from_collection(collection_name, job_ids):
+
+    return rest_obj.delete_by_filter(collection_name, {"metadata.job_id": job_ids})
+
+
 def get_embedding(text_block, embed_model, separators=None, chunk_size=None, timeout=5*60):
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
+    record_model_use(embed_model)
 
     return rest_obj.get_embedding(text_block, embed_model, separators, chunk_size, timeout)
 
 
-def add_points(embed_model, collection_name, vectors, texts=None, metadata={}, timeout=15):
+def iter_embeddings(text_blocks, embed_model, separators=None, chunk_size=None, max_workers=None, timeout=5*60):
 
-    rest_obj = RAG_SEARCH_REST_API_Client(url=config.rag_search_url)
+    record_model_use(embed_model)
+
+    return rest_obj.iter_embeddings(
+        text_blocks,
+        embed_model,
+        separators,
+        chunk_size,
+        max_workers or config.embed_max_workers,
+        timeout)
+
+
+def add_points(embed_model, collection_name, vectors, texts=None, metadata={}, timeout=15):
 
     return rest_obj.add_points(embed_model, collection_name, vectors, texts, metadata, timeout)
+
+
+def add_points_bulk(embed_model, collection_name, vectors, texts, metadata, batch_size=None, timeout=60):
+    """
+    Upload points with per-point metadata in requests of at most batch_size points.
+    """
+
+    batch_size = batch_size or config.add_points_batch_size
+
+    for start in range(0, len(vectors), batch_size):
+
+        end = start + batch_size
+
+        status, output = rest_obj.add_points(
+            embed_model,
+            collection_name,
+            vectors[start:end],
+            texts[start:end],
+            metadata[start:end],
+            timeout)
+
+        if not status:
+            return False, output
+
+    return True, None
@@ -34,6 +34,9 @@ class REST_API_Client():
 
         self.user = user
 
+        # optional requests.Session for connection pooling (set by subclasses)
+        self.session = None
+
         self.headers = {
             'Content-Type': 'application/json',
             'accept': 'application/json',
@@ -59,13 +62,14 @@ class REST_API_Client():
     def request(self, method, url, timeout=10, verify=True, stream=False, decode=True, **kwargs):
 
         try:
-            response = requests.request(method,
-                                        url,
-                                        headers=self.headers,
-                                        timeout=timeout,
-                                        verify=verify,
-                                        stream=stream,
-                                        **kwargs)
+            requester = self.session or requests
+            response = requester.request(method,
+                                         url,
+                                         headers=self.headers,
+                                         timeout=timeout,
+                                         verify=verify,
+                                         stream=stream,
+                                         **kwargs)
         except Exception as E:
             return False, str(E)
 
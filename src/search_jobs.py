@@ -11,6 +11,8 @@ from sidebar_processor import employment_type_options, experience_options
 from models_sql import Session, Job, Company
 from db_profiles import load_profile
 from JSearch_api import JSearch_REST_API_Client
+import enrichment_daemon
+import preview_summary
 
 jSearch = JSearch_REST_API_Client(url="https://jsearch.p.rapidapi.com")
 
@@ -106,6 +108,8 @@ def start_job_search():
     job_ids = [job["job_id"] for job in result_list if "job_id" in job]
     st.session_state["job_id_list"] = job_ids
 
+    enrichment_daemon.schedule(job_ids)
+
 
 def is_candidate(job_details, distance_radius, my_latitude, my_longitude):
 
@@ -194,6 +198,9 @@ def insert_jobs_db(result_list):
             apply_link=job_data.get("job_apply_link"),
             apply_options=job_data.get("job_apply_options"),
             job_google_link=job_data.get("job_google_link"),
+            preview_summary=preview_summary.build_preview(
+                job_data.get("job_description"),
+                job_data.get("job_highlights")),
             company=company)
 
         db_session.add(job)
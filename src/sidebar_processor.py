@@ -9,12 +9,15 @@ from nominatim_api import get_coordinates
 from sqlalchemy import delete
 
 import config
-from models_sql import Session, Job, JobEmbedding
+from models_sql import Session, Job, JobEmbedding, EmbeddingCache, JobSkill, CollectionJob, SummaryCache
 from locale_utils import get_countries, get_languages
 from db_profiles import get_all_profiles, load_profile, save_profile, set_active_profile, get_active_profile, clear_resume
 from models_redis import redis_client
-from job_embedder import summarize_and_embed
-from chat_llm import send_prompt_to_llm
+import model_registry
+import collection_manager
+import enrichment_priority
+import embedding_versions
+from job_embedder import summarize_and_embed, get_collection_name
 from resume_summarize import summarize_resume
 
 
@@ -259,6 +262,50 @@ def update_sidebar():
 
     st.divider()
 
+    with st.expander("📊 Model Residency", expanded=False):
+        st.json(model_registry.get_metrics())
+
+    if st.button("🧹 Clean Up Vector Collections", use_container_width=False):
+
+        with Session() as db_session:
+            status, output = collection_manager.collect_garbage(
+                db_session,
+                keep=[get_collection_name(config.embed_model)])
+
+        if not status:
+            st.error(f"❌ Failed to clean up collections: {output}")
+        elif not output["deleted"]:
+            st.success("✅ No idle collections to remove.")
+        else:
+            unknown = f", size of {output['unknown_size']} unknown" if output["unknown_size"] else ""
+            st.success(
+                f"✅ Removed {len(output['deleted'])} collections, "
+                f"reclaimed {output['points_reclaimed']} points (~{output['bytes_reclaimed'] / 1e6:.1f} MB{unknown}).")
+
+    with st.expander("🧬 Stored Embeddings", expanded=False):
+
+        with Session() as db_session:
+            versions = embedding_versions.get_versions(db_session)
+
+        current = embedding_versions.current_version()
+
+        for embed_model, chunker_version, job_count, chunk_count in versions:
+            marker = " (current)" if (embed_model, chunker_version) == current else ""
+            st.markdown(f"- **{embed_model or 'unversioned'}** v{chunker_version or '?'}: {job_count} jobs, {chunk_count} chunks{marker}")
+
+        if not versions:
+            st.write("No embeddings stored.")
+
+        if st.button("🧹 Remove Old Embedding Versions", use_container_width=False):
+
+            with Session() as db_session:
+                status, output = embedding_versions.collect_garbage(db_session)
+
+            if not status:
+                st.error(f"❌ Failed to remove old embeddings: {output}")
+            else:
+                st.success(f"✅ Removed {output} chunk embeddings of unused models and chunker versions.")
+
     if st.button("🗑️ Clear Job Cache", use_container_width=False):
 
         try:
@@ -274,6 +321,10 @@ def update_sidebar():
         try:
             db_session.query(Job).filter(Job.is_summarized == True).update(
                 {Job.is_summarized: False}, synchronize_session=False)
+            db_session.query(Job).update(
+                {Job.seniority: None, Job.remote_policy: None, Job.min_years_experience: None}, synchronize_session=False)
+            db_session.execute(delete(JobSkill))
+            db_session.execute(delete(SummaryCache))
             db_session.commit()
             st.success(f"✅ Cleared summarization.")
         except Exception as e:
@@ -285,9 +336,9 @@ def update_sidebar():
         db_session = Session()
 
         try:
-            db_session.query(Job).filter(Job.is_embedded == True).update(
-                {Job.is_embedded: False}, synchronize_session=False)
             db_session.execute(delete(JobEmbedding))
+            db_session.execute(delete(EmbeddingCache))
+            db_session.execute(delete(CollectionJob))
             db_session.commit()
             st.success(f"✅ Cleared embeddings.")
         except Exception as e:
@@ -393,12 +444,11 @@ def process_llm(user_prompt):
         st.warning(output)
         return
 
-    status, output = send_prompt_to_llm(user_prompt, visible_job_ids)
-    if not status:
-        st.warning(output)
-        return
-
-    st.session_state["llm_response"] = output
+    # the answer is streamed into the main pane (see main.py)
+    st.session_state["llm_request"] = {
+        "user_prompt": user_prompt,
+        "job_ids": visible_job_ids
+    }
 
 
 def get_visible_jobs():
@@ -406,4 +456,12 @@ def get_visible_jobs():
     visible_job_ids_fav = st.session_state.get("visible_job_ids_fav")
     visible_job_ids = st.session_state.get("visible_job_ids")
 
-    return visible_job_ids_fav or visible_job_ids
+    job_ids = visible_job_ids_fav or visible_job_ids
+    if not job_ids:
+        return job_ids
+
+    # enrich what the user is looking at first
+    return enrichment_priority.order_job_ids(
+        job_ids,
+        st.session_state.get("favorite_jobs", ()),
+        st.session_state.get("focused_job_ids", ()))
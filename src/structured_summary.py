@@ -0,0 +1,121 @@
+
+import re
+import json
+
+# Machine-readable facts requested alongside the Markdown job summary and stored in
+# indexed columns (jobs.seniority, jobs.remote_policy, jobs.min_years_experience) and
+# the job_skills table, so they can be filtered in SQL without asking an LLM.
+
+seniority_levels = [
+    "Intern",
+    "Entry-Level",
+    "Junior",
+    "Mid-Level",
+    "Senior",
+    "Lead / Staff",
+    "Principal / Architect",
+    "Executive"
+]
+
+remote_policies = ["Remote", "Hybrid", "On-site"]
+
+max_skills = 40
+
+structured_summary_prompt = f"""
+After the summary, append a JSON block fenced with ```json and ``` containing exactly these keys:
+- "seniority": one of {json.dumps(seniority_levels)}, or null if unclear
+- "min_years_experience": minimum years of experience required as an integer, or null if not stated
+- "remote_policy": one of {json.dumps(remote_policies)}, or null if not stated
+- "skills": list of the required and preferred technologies, tools, programming languages and frameworks, as short names
+"""
+
+json_block_pattern = re.compile(r"```json\s*(\{.*?\})\s*```", re.DOTALL)
+
+
+def parse_summary(llm_output):
+    """
+    Split an LLM summary into its Markdown text and the validated structured fields.
+    Returns (markdown, fields); fields is None when the JSON block is missing or invalid.
+    """
+
+    match = json_block_pattern.search(llm_output)
+    if not match:
+        return llm_output.strip(), None
+
+    markdown = (llm_output[:match.start()] + llm_output[match.end():]).strip()
+
+    try:
+        data = json.loads(match.group(1))
+    except ValueError:
+        return markdown, None
+
+    if not isinstance(data, dict):
+        return markdown, None
+
+    fields = {
+        "seniority": match_choice(data.get("seniority"), seniority_levels),
+        "remote_policy": match_choice(data.get("remote_policy"), remote_policies),
+        "min_years_experience": parse_years(data.get("min_years_experience")),
+        "skills": parse_skills(data.get("skills"))
+    }
+
+    return markdown, fields
+
+
+def match_choice(value, choices):
+
+    if not isinstance(value, str):
+        return None
+
+    normalized = re.sub(r"[^a-z]", "", value.lower())
+
+    for choice in choices:
+        if re.sub(r"[^a-z]", "", choice.lower()) == normalized:
+            return choice
+
+    # e.g. "Senior" in "Senior / Lead", "Onsite" for "On-site"
+    for choice in choices:
+        if any(re.sub(r"[^a-z]", "", part.lower()) == normalized for part in choice.split("/")):
+            return choice
+
+    return None
+
+
+def parse_years(value):
+
+    if isinstance(value, bool):
+        return None
+
+    if isinstance(value, (int, float)):
+        years = int(value)
+    elif isinstance(value, str) and re.match(r"^\s*\d+", value):
+        years = int(re.match(r"^\s*(\d+)", value).group(1))
+    else:
+        return None
+
+    return years if 0 <= years <= 50 else None
+
+
+def parse_skills(value):
+
+    if not isinstance(value, list):
+        return []
+
+    skills = []
+
+    for skill in value:
+
+        if not isinstance(skill, str):
+            continue
+
+        skill = re.sub(r"\s+", " ", skill).strip()
+
+        if skill and len(skill) <= 50 and skill.lower() not in (s.lower() for s in skills):
+            skills.append(skill)
+
+    return skills[:max_skills]
+
+
+def normalize_skill(skill):
+
+    return skill.lower()
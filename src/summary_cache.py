@@ -0,0 +1,52 @@
+
+import re
+import hashlib
+from sqlalchemy.dialects.postgresql import insert
+
+from models_sql import SummaryCache
+
+
+def normalize_text(text):
+
+    text = text.replace("\r\n", "\n")
+    text = re.sub(r"[ \t]+", " ", text)      # collapse spaces
+    text = re.sub(r"\n\s*\n+", "\n\n", text) # collapse blank lines
+    return text.strip()
+
+
+def get_key(job_text, llm_model, prompt_version):
+
+    hash_input = f"{llm_model}\n{prompt_version}\n{normalize_text(job_text)}".encode("utf-8")
+    return hashlib.sha256(hash_input).hexdigest()
+
+
+def lookup(db_session, keys):
+    """
+    Returns a dict content_hash -> summary for the keys found in the cache.
+    """
+
+    if not keys:
+        return {}
+
+    rows = (
+        db_session.query(SummaryCache.content_hash, SummaryCache.summary)
+        .filter(SummaryCache.content_hash.in_(set(keys)))
+        .all()
+    )
+
+    return {content_hash: summary for content_hash, summary in rows}
+
+
+def store(db_session, key, llm_model, prompt_version, summary):
+    """
+    Add a summary to the cache; does not commit. Concurrent writers of the same key are fine.
+    """
+
+    stmt = insert(SummaryCache).values(
+        content_hash=key,
+        llm_model=llm_model,
+        prompt_version=prompt_version,
+        summary=summary
+    ).on_conflict_do_nothing(index_elements=["content_hash"])
+
+    db_session.execute(stmt)
@@ -0,0 +1,92 @@
+import token_counter
+
+# Local replacement for the RAG-Search splitter (split-doc and the chunk_size of embed_text).
+# Uses the same separators, paragraph, then line, then word, then a hard cut, but sizes
+# chunks in tokens of the target model. Splitting locally is free and deterministic, so
+# chunks are known before anything is sent: they can be deduplicated, looked up in the
+# embedding cache and packed into embedding batches.
+
+# bump whenever chunk boundaries change, so embeddings are redone (see embedding_versions)
+chunker_version = 3
+
+default_separators = ["\n\n", "\n", " "]
+
+
+def split_text(text, max_tokens, model_name, separators=None):
+    """
+    Split text into chunks of at most max_tokens tokens of model_name.
+    Adjacent pieces are merged greedily up to the limit; empty chunks are dropped.
+    Each piece is counted once, together with the separator joining it to the chunk, and a
+    chunk's size is the running sum. Sums tend to over-count (a piece can share tokens with
+    its neighbour), so a chunk is measured as a whole before it is closed. They can also
+    under-count slightly: pass a max_tokens with some headroom below the model's limit.
+    """
+
+    separators = default_separators if separators is None else separators
+
+    def count(piece):
+        return token_counter.count_tokens(piece, model_name)
+
+    def split(piece, separators):
+
+        if count(piece) <= max_tokens:
+            return [piece]
+
+        if not separators:
+            # hard cut; always make progress even if a single character is over the limit
+            head = token_counter.truncate_to_tokens(piece, max_tokens, model_name) or piece[:1]
+            return [head] + split(piece[len(head):].lstrip(), separators)
+
+        separator, rest = separators[0], separators[1:]
+
+        chunks = []
+        current = []
+        current_tokens = 0
+
+        for part in piece.split(separator):
+
+            part_tokens = count(part)
+
+            if part_tokens > max_tokens:
+                if current:
+                    chunks.append(separator.join(current))
+                chunks.extend(split(part, rest))
+                current, current_tokens = [], 0
+                continue
+
+            if not current:
+                current, current_tokens = [part], part_tokens
+                continue
+
+            # " word" is usually a single token, so count the part with its separator
+            joined_tokens = current_tokens + count(separator + part)
+
+            if joined_tokens > max_tokens:
+                # the sum may be too high: measure the chunk once before closing it
+                joined_tokens = count(separator.join(current + [part]))
+
+            if joined_tokens <= max_tokens:
+                current.append(part)
+                current_tokens = joined_tokens
+                continue
+
+            chunks.append(separator.join(current))
+            current, current_tokens = [part], part_tokens
+
+        if current:
+            chunks.append(separator.join(current))
+
+        return chunks
+
+    return [chunk for chunk in split(text, separators) if chunk.strip()]
+
+
+def split_texts(text_blocks, max_tokens, model_name, separators=None):
+    """
+    Split a {key: text} dict; returns {key: [chunk, ...]}.
+    """
+
+    return {
+        key: split_text(text or "", max_tokens, model_name, separators)
+        for key, text in text_blocks.items()
+    }
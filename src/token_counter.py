@@ -0,0 +1,131 @@
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import config
+
+# Local tokenizers are optional: without them (or without network access to fetch
+# a tokenizer the first time) counts fall back to the chars-per-token estimate.
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+log = logging.getLogger(__name__)
+
+avg_chars_per_token = 3.5  # in English, fallback only
+
+tokenizers_cache = {}      # model name -> encode function, or None when unavailable
+tokenizers_lock = threading.Lock()
+
+token_count_cache = OrderedDict()  # (model name, text hash) -> token count
+token_count_cache_size = 20000
+token_count_lock = threading.Lock()
+
+
+def get_tokenizer(model_name):
+    """
+    Returns a function text -> list of token ids for model_name, or None.
+    config.tokenizer_map maps a model to "tiktoken:<encoding>" or "hf:<repo id>".
+    """
+
+    with tokenizers_lock:
+
+        if model_name in tokenizers_cache:
+            return tokenizers_cache[model_name]
+
+        encode = load_tokenizer(model_name)
+        tokenizers_cache[model_name] = encode
+
+        return encode
+
+
+def load_tokenizer(model_name):
+
+    spec = config.tokenizer_map.get(model_name)
+    if not spec:
+        log.info(f"[TokenCounter] no tokenizer configured for {model_name}, estimating")
+        return None
+
+    kind, _, name = spec.partition(":")
+
+    try:
+
+        if kind == "tiktoken" and tiktoken:
+            encoding = tiktoken.get_encoding(name)
+            return lambda text: encoding.encode(text, disallowed_special=())
+
+        if kind == "hf" and Tokenizer:
+            tokenizer = Tokenizer.from_pretrained(name)
+            return lambda text: tokenizer.encode(text, add_special_tokens=False).ids
+
+        log.warning(f"[TokenCounter] tokenizer library for '{spec}' is not installed, estimating")
+
+    except Exception as e:
+        log.warning(f"[TokenCounter] cannot load tokenizer '{spec}' for {model_name}: {e}")
+
+    return None
+
+
+def count_tokens(text, model_name):
+
+    if not text:
+        return 0
+
+    key = (model_name, hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+    with token_count_lock:
+        if key in token_count_cache:
+            token_count_cache.move_to_end(key)
+            return token_count_cache[key]
+
+    encode = get_tokenizer(model_name)
+
+    if encode:
+        count = len(encode(text))
+    else:
+        count = int(len(text) / avg_chars_per_token) + 1
+
+    with token_count_lock:
+        token_count_cache[key] = count
+        if len(token_count_cache) > token_count_cache_size:
+            token_count_cache.popitem(last=False)
+
+    return count
+
+
+def truncate_to_tokens(text, max_tokens, model_name):
+    """
+    Longest prefix of text (cut at a whitespace when possible) with at most max_tokens tokens.
+    """
+
+    if max_tokens <= 0:
+        return ""
+
+    if count_tokens(text, model_name) <= max_tokens:
+        return text
+
+    # binary search on the character length
+    low, high = 0, len(text)
+
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid], model_name) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+
+    prefix = text[:low]
+
+    cut = prefix.rfind(" ")
+    if cut > low * 0.8:
+        prefix = prefix[:cut]
+
+    return prefix.rstrip()
@@ -0,0 +1,217 @@
+
+import os
+import re
+import threading
+
+import numpy as np
+from sqlalchemy import func, and_
+
+import config
+import text_splitter
+from models_sql import JobEmbedding
+
+# In-process copy of the chunk vectors stored in job_embeddings, for semantic
+# search without a round trip to RAG-Search.
+#
+# Per embedding model and chunker version, two append-only files live in config.vector_index_dir:
+#   <model>_v<version>.vectors  float32 rows, L2-normalized, memory-mapped for search
+#   <model>_v<version>.ids      int64 pairs (job_embeddings.id, jobs.id), one per row
+# Only job_embeddings rows produced by that model and version are indexed. New rows are
+# appended as they land in Postgres; the files are rebuilt only when rows were deleted
+# (e.g. "Clear All Embeddings").
+
+
+class VectorIndex:
+
+    def __init__(self, embed_model, chunker_version=None, index_dir=None):
+
+        self.embed_model = embed_model
+        self.chunker_version = chunker_version or text_splitter.chunker_version
+        self.index_dir = index_dir or config.vector_index_dir
+
+        base_name = re.sub(r"[^a-zA-Z0-9_-]", "_", f"{embed_model}_v{self.chunker_version}")
+        self.vectors_path = os.path.join(self.index_dir, f"{base_name}.vectors")
+        self.ids_path = os.path.join(self.index_dir, f"{base_name}.ids")
+
+        self.dim = None
+        self.vectors = None                            # np.memmap (rows, dim)
+        self.ids = np.empty((0, 2), dtype=np.int64)    # (embedding id, job id)
+
+        self.lock = threading.Lock()
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.load()
+
+
+    def __len__(self):
+
+        return len(self.ids)
+
+
+    def load(self):
+
+        if not os.path.exists(self.ids_path) or not os.path.exists(self.vectors_path):
+            return
+
+        ids = np.fromfile(self.ids_path, dtype=np.int64).reshape(-1, 2)
+        rows = len(ids)
+
+        if rows == 0:
+            return
+
+        dim = os.path.getsize(self.vectors_path) // (rows * 4)
+        if dim == 0 or os.path.getsize(self.vectors_path) != rows * dim * 4:
+            # the two files disagree (interrupted append): start over
+            self.clear()
+            return
+
+        self.dim = dim
+        self.ids = ids
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, dim))
+
+
+    def clear(self):
+
+        for path in (self.vectors_path, self.ids_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+        self.dim = None
+        self.vectors = None
+        self.ids = np.empty((0, 2), dtype=np.int64)
+
+
+    def refresh(self, db_session, batch_size=5000):
+        """
+        Append job_embeddings rows newer than the last indexed one.
+        Returns the number of rows added.
+        """
+
+        with self.lock:
+
+            last_id = int(self.ids[-1, 0]) if len(self.ids) else 0
+
+            # rows were deleted below the high-water mark: rebuild from scratch
+            if last_id:
+                count = (
+                    db_session.query(func.count(JobEmbedding.id))
+                    .filter(self.row_filter(), JobEmbedding.id <= last_id)
+                    .scalar()
+                )
+                if count != len(self.ids):
+                    self.clear()
+                    last_id = 0
+
+            added = 0
+
+            while True:
+
+                rows = (
+                    db_session.query(JobEmbedding.id, JobEmbedding.job_id, JobEmbedding.embedding)
+                    .filter(self.row_filter(), JobEmbedding.id > last_id)
+                    .order_by(JobEmbedding.id)
+                    .limit(batch_size)
+                    .all()
+                )
+
+                if not rows:
+                    break
+
+                self.append(rows)
+
+                last_id = rows[-1][0]
+                added += len(rows)
+
+            if added:
+                self.load()
+
+            return added
+
+
+    def row_filter(self):
+
+        return and_(
+            JobEmbedding.embed_model == self.embed_model,
+            JobEmbedding.chunker_version == self.chunker_version)
+
+
+    def append(self, rows):
+
+        vectors = np.asarray([row[2] for row in rows], dtype=np.float32)
+
+        if self.dim is not None and vectors.shape[1] != self.dim:
+            raise ValueError(f"vector dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.maximum(norms, 1e-12)
+
+        ids = np.asarray([(row[0], row[1]) for row in rows], dtype=np.int64)
+
+        # vectors first: a crash in between leaves a size mismatch that load() detects
+        with open(self.vectors_path, "ab") as f:
+            vectors.tofile(f)
+
+        with open(self.ids_path, "ab") as f:
+            ids.tofile(f)
+
+        self.dim = vectors.shape[1]
+
+
+    def search(self, query_vector, k=10, job_ids=None):
+        """
+        Top-k jobs by cosine similarity of their best-matching chunk.
+        job_ids optionally restricts the search to these jobs.id values.
+        Returns a list of (job id, score), best first.
+        """
+
+        with self.lock:
+            vectors = self.vectors
+            row_job_ids = self.ids[:, 1]
+
+        if vectors is None or not len(row_job_ids):
+            return []
+
+        query = np.array(query_vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+
+        if job_ids is not None:
+            mask = np.isin(row_job_ids, np.fromiter(job_ids, dtype=np.int64))
+            rows = np.nonzero(mask)[0]
+            if not len(rows):
+                return []
+            scores = vectors[rows] @ query
+            row_job_ids = row_job_ids[rows]
+        else:
+            scores = vectors @ query
+
+        # best chunk per job
+        order = np.argsort(-scores)
+
+        results = []
+        seen = set()
+
+        for i in order:
+
+            job_id = int(row_job_ids[i])
+            if job_id in seen:
+                continue
+
+            seen.add(job_id)
+            results.append((job_id, float(scores[i])))
+
+            if len(results) >= k:
+                break
+
+        return results
+
+
+indexes = {}
+indexes_lock = threading.Lock()
+
+
+def get_index(embed_model):
+
+    with indexes_lock:
+        if embed_model not in indexes:
+            indexes[embed_model] = VectorIndex(embed_model)
+        return indexes[embed_model]
@@ -0,0 +1,159 @@
+
+import time
+import logging
+
+from sqlalchemy import text
+
+import config
+
+log = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Batches ORM writes into fewer commits.
+
+    Each add() call is one unit of work (e.g. a job together with its summary and
+    is_summarized=True, or all embedding rows of a job). Units are never split across
+    commits, so a job is only ever marked done together with its data; a crash loses
+    at most the unflushed units, which simply stay undone and are redone later.
+    """
+
+    def __init__(self, db_session, max_items=None, max_seconds=None):
+        """
+        :param max_items: flush once this many units are pending
+        :param max_seconds: flush once the oldest pending unit is this old
+        """
+
+        self.db_session = db_session
+        self.max_items = max_items or config.write_buffer_max_items
+        self.max_seconds = max_seconds or config.write_buffer_max_seconds
+
+        self.pending = 0
+        self.first_pending_at = None
+        self.commits = 0
+
+
+    def __enter__(self):
+
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        if exc_type is None:
+            self.flush()
+        else:
+            self.db_session.rollback()
+
+        return False
+
+
+    def add(self, *objects):
+
+        for obj in objects:
+            self.db_session.add(obj)
+
+        self.added()
+
+
+    def execute(self, statement):
+        """
+        Run a Core statement (e.g. an INSERT ... ON CONFLICT) as one unit of work.
+        """
+
+        self.db_session.execute(statement)
+
+        self.added()
+
+
+    def added(self):
+
+        if not self.pending:
+            self.first_pending_at = time.monotonic()
+
+        self.pending += 1
+
+        self.flush_if_due()
+
+
+    def flush_if_due(self):
+
+        if not self.pending:
+            return
+
+        if self.pending >= self.max_items or time.monotonic() - self.first_pending_at >= self.max_seconds:
+            self.flush()
+
+
+    def flush(self):
+
+        if not self.pending:
+            return
+
+        try:
+            self.db_session.commit()
+        except Exception:
+            self.db_session.rollback()
+            raise
+
+        self.commits += 1
+        self.pending = 0
+        self.first_pending_at = None
+
+
+def benchmark_commits(num_rows=1000, batch_sizes=(1, 10, 25, 100, 500)):
+    """
+    Measure the cost of committing every row versus committing in batches.
+    Uses a scratch table that is dropped afterwards.
+    """
+
+    from models_sql import engine
+
+    payload = "x" * 500
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS commit_benchmark (id SERIAL PRIMARY KEY, payload TEXT)"))
+
+    results = {}
+
+    try:
+
+        for batch_size in batch_sizes:
+
+            start = time.perf_counter()
+
+            with engine.connect() as conn:
+
+                for i in range(num_rows):
+
+                    conn.execute(text("INSERT INTO commit_benchmark (payload) VALUES (:payload)"), {"payload": payload})
+
+                    if (i + 1) % batch_size == 0:
+                        conn.commit()
+
+                conn.commit()
+
+            results[batch_size] = time.perf_counter() - start
+
+    finally:
+
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS commit_benchmark"))
+
+    return results
+
+
+if __name__ == "__main__":
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    num_rows = 1000
+    results = benchmark_commits(num_rows)
+
+    baseline = results[1]
+
+    log.info(f"{'batch size':>10} | {'total (s)':>9} | {'per row (ms)':>12} | {'speedup':>7}")
+
+    for batch_size, elapsed in results.items():
+        log.info(f"{batch_size:>10} | {elapsed:>9.3f} | {elapsed / num_rows * 1000:>12.3f} | {baseline / elapsed:>6.1f}x")